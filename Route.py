@@ -1,8 +1,10 @@
 import streamlit as st
 from config import Columns
 from utils.backdata import *
+from utils.query import load_cargo_query
 from utils.sidebar import *
 from utils.contents import *
+from utils.metrics import start_metrics, finish_metrics
 from authentication import initialize_auth
 
 # 인증 시스템 초기화
@@ -17,6 +19,7 @@ if not auth_manager.is_logged_in():
         auth_manager.render_login()
 else:
     # Main application after successful login
+    start_metrics("Route")  # METRICS=1일 때만 단계별 시간 기록
     load_css()
     
     # Add user info and logout button in sidebar
@@ -24,45 +27,33 @@ else:
         auth_manager.render_user_info()
     
     # --- Data Load ---
-    cargo_df = load_cargo_data()
-    airport_ref = load_airport_ref()
-    airline_ref = load_airline_ref()
-    aircraft_ref = load_aircraft_ref()
+    years = list_cargo_years()
+    cargo_query = load_cargo_query(get_selected_years(years))
 
     # --------------------- SideBar Start ---------------------
-    cargo_df = filter_by_cargo_route(cargo_df, airport_ref, airline_ref, aircraft_ref, key_prefix="main")
+    cargo_query = filter_by_cargo_route(cargo_query, key_prefix="main", years=years or None)
     # --------------------- SideBar End ---------------------
 
     # --------------------- Contents Start ---------------------
     st.subheader(f"👨🏽 Summary")
+    summary = cargo_query.summary()
     text = f"""
-            * [기간] {cargo_df[Columns.FLIGHT_DATE].dt.date.min()} ~ {cargo_df[Columns.FLIGHT_DATE].dt.date.max()}
-            * [운항편수] {len(cargo_df[[Columns.FLIGHT_DATE, Columns.FLIGHT_NUM]].drop_duplicates()):,}편
-            * [총 환적중량] {cargo_df[Columns.TOTAL_WEIGHT].sum():,.0f} 톤
+            * [기간] {summary["start"]} ~ {summary["end"]}
+            * [운항편수] {summary["flights"]:,}편
+            * [총 환적중량] {summary["weight"]:,.0f} 톤
             """
     st.write_stream(stream_data(text))
     # --------------------- Contents End ---------------------
 
-    # --------------------- Contents Start ---------------------
-    fig = make_cargo_route_pie_chart(cargo_df, airport_ref)
-    if fig != None:
-        st.plotly_chart(fig, use_container_width=True)
-    # --------------------- Contents End ---------------------
+    # 아래 차트들은 필터된 데이터를 한 번만 합산한 결과를 나눠 씁니다.
+    route_df = cargo_query.aggregate(ROUTE_PAGE_KEYS)
 
     # --------------------- Contents Start ---------------------
-    st.caption(f" * 인터넷 접속이 제한되어 배경지도가 나타나지 않을 수 있습니다.")
-    tab1, tab2 = st.tabs(["출발도시", "도착도시"])
-    with tab1:
-        fig = make_cargo_mapbox(cargo_df, airport_ref, io="전")
-        st.plotly_chart(fig, use_container_width=True)
-    with tab2:
-        fig = make_cargo_mapbox(cargo_df, airport_ref, io="후")
-        st.plotly_chart(fig, use_container_width=True)
+    # 섹션별로 따로 다시 그려지며, 지도는 선택한 화면만 계산합니다.
+    render_cargo_route_pie_section(route_df)
+    render_cargo_map_section(route_df)
+    render_cargo_treemap_section(route_df)
     # --------------------- Contents End ---------------------
 
-    # --------------------- Contents Start ---------------------
-    st.subheader(f"🛫 점유율 분석")
-    fig = make_cargo_treemap(cargo_df)
-    if fig != None:
-        st.plotly_chart(fig, use_container_width=True)
-    # --------------------- Contents End ---------------------
\ No newline at end of file
+    # 관리자에게는 이번 실행의 단계별 소요 시간을 사이드바에 보여 줍니다.
+    finish_metrics(show_panel=auth_manager.is_admin())
@@ -135,6 +135,11 @@ class AuthenticationManager:
             "roles": user_data.get("roles", []),
         }
 
+    def is_admin(self):
+        """Check if the current user has the admin role"""
+        user_info = self.get_user_info()
+        return bool(user_info) and "admin" in (user_info["roles"] or [])
+
     def is_logged_in(self):
         """Check login status"""
         return st.session_state.get("authentication_status", False)
@@ -0,0 +1,346 @@
+"""화물 대시보드 성능 측정 (합성 데이터)
+
+실제 NAS 데이터나 브라우저 없이 합성 cargo_transfer.parquet / oag_ref.xlsx를 규모별로 만들고,
+로드 → 참조 병합 → 큐브/KPI 집계 → 사이드바 필터 → 요약/차트 단계를 Streamlit 런타임 없이 실행해
+단계별 소요 시간과 최대 메모리를 출력합니다. 규모마다 별도 프로세스에서 빈 캐시로 실행합니다.
+
+    uv run python benchmark_cargo.py                          # 1배 규모
+    uv run python benchmark_cargo.py --scale 1 10 100         # 1배/10배/100배 규모
+    uv run python benchmark_cargo.py --output bench.json      # 결과 저장
+    uv run python benchmark_cargo.py --baseline bench.json    # 저장된 결과보다 느려진 단계가 있으면 종료 코드 1
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import Columns, REGION_CODE_MAPPING
+
+# 1배 규모의 화물 행 수 (현재 운영 데이터 수준)
+BENCH_BASE_ROWS = 200_000
+# 운항 스케줄의 편명 수 - 규모가 커지면 편당 환적 건수가 늘어납니다 (같은 운항일자/편명이 여러 행).
+BENCH_FLIGHTS = 600
+BENCH_YEARS = (2023, 2024)
+BENCH_WORK_DIR = Path(tempfile.gettempdir()) / "cargo-bench"
+
+REGION_NAMES = {
+    "AF": "Africa",
+    "EU": "Europe",
+    "AS": "Asia",
+    "LA": "Latin America",
+    "NA": "North America",
+    "ME": "Middle East",
+    "SW": "Southwest Pacific",
+}
+
+
+# --- Synthetic Data ---
+def get_random_codes(rng, count, length):
+    """서로 다른 대문자 코드 count개"""
+    numbers = rng.choice(26 ** length, size=count, replace=False)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    return ["".join(letters[(number // 26 ** np.arange(length)) % 26]) for number in numbers]
+
+
+def generate_ref_workbook(path, rng, airports=300, airlines=80, aircraft=40):
+    """oag_ref.xlsx와 같은 시트/컬럼의 참조 데이터 (공항/항공사/기종)"""
+    region_codes = rng.choice(list(REGION_CODE_MAPPING), size=airports)
+    countries = np.array([f"{code} Country {i % 5}" for i, code in enumerate(region_codes)], dtype=object)
+    # 노선 매핑(일본/중국)이 국가명으로 잡히는 공항도 둡니다.
+    countries[region_codes == "AS4"] = rng.choice(["Japan", "China", "Korea"], size=(region_codes == "AS4").sum())
+    airport_codes = get_random_codes(rng, airports, 3)
+    airport_df = pd.DataFrame({
+        "IATA": airport_codes,
+        "Airport Name": [f"{code} Airport" for code in airport_codes],
+        "City Name": [f"City {i // 2}" for i in range(airports)],  # 도시 하나에 공항 두 개
+        "Country Name": countries,
+        "Region Name": [REGION_NAMES[code[:2]] for code in region_codes],
+        "Region Code": region_codes,
+        "Longitude": rng.uniform(-180, 180, airports),
+        "Latitude": rng.uniform(-60, 70, airports),
+    })
+    airline_codes = get_random_codes(rng, airlines, 2)
+    airline_df = pd.DataFrame({
+        "IATA": airline_codes,
+        "Airline Name": [f"Airline {code}" for code in airline_codes],
+        "Country Name": rng.choice(["Korea", "United States", "China", "Japan", "Germany", "UAE"], size=airlines),
+        "Eff From": pd.Timestamp("2000-01-01"),
+        # 1938년은 종료일 없음(+100년)으로 해석됩니다. 일부는 이미 종료된 항공사로 둡니다.
+        "Eff To": np.where(rng.random(airlines) < 0.95, pd.Timestamp("1938-01-01"), pd.Timestamp("2001-01-01")),
+    })
+    aircraft_codes = get_random_codes(rng, aircraft, 3)
+    aircraft_df = pd.DataFrame({
+        "IATA": aircraft_codes,
+        "Manufacturer": rng.choice(["Boeing", "Airbus"], size=aircraft),
+        "Acft Name": [f"Aircraft {code}" for code in aircraft_codes],
+        "Cat Name": "W",
+        "Class": np.where(np.arange(aircraft) % 3 == 0, "F", "P"),
+    })
+    with pd.ExcelWriter(path) as writer:
+        airport_df.to_excel(writer, sheet_name="Airport Code", index=False)
+        airline_df.to_excel(writer, sheet_name="Airline Code", index=False)
+        aircraft_df.to_excel(writer, sheet_name="Aircraft Code", index=False)
+    return airport_df, airline_df, aircraft_df
+
+
+def generate_cargo_data(data_dir, rows, seed=0, years=BENCH_YEARS):
+    """DATA_DIR과 같은 구조(fois-cargo/cargo_transfer.parquet, oag_ref.xlsx)로 합성 데이터 생성
+
+    편명마다 항공사/도착 공항/기종을 고정한 운항 스케줄을 만들고, 환적 건은 운항일자와 편을 골라
+    출발 공항만 달리 붙입니다 (원본과 같이 운항일자는 문자열, 중량은 kg 문자열).
+    """
+    data_dir = Path(data_dir)
+    (data_dir / "fois-cargo").mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    airport_df, airline_df, aircraft_df = generate_ref_workbook(data_dir / "oag_ref.xlsx", rng)
+
+    dates = pd.date_range(f"{min(years)}-01-01", f"{max(years)}-12-31").strftime("%Y-%m-%d").to_numpy()
+    flights = BENCH_FLIGHTS
+    airlines = rng.integers(0, len(airline_df), flights)
+    aircraft = rng.integers(0, len(aircraft_df), flights)
+    schedule = pd.DataFrame({
+        Columns.FLIGHT_NUM: [f"{airline_df['IATA'][a]}{n:04d}" for a, n in zip(airlines, range(1, flights + 1))],
+        Columns.ARRIVAL: rng.choice(airport_df["IATA"], size=flights),
+        Columns.AIRLINE: airline_df["IATA"].to_numpy()[airlines],
+        Columns.AIRCRAFT_TYPE: aircraft_df["IATA"].to_numpy()[aircraft],
+        Columns.PASSENGER_CARGO: np.where(aircraft_df["Class"].to_numpy()[aircraft] == "F", "화물", "여객"),
+    })
+
+    picked = rng.integers(0, flights, rows)
+    df = schedule.iloc[picked].reset_index(drop=True)
+    df.insert(0, Columns.FLIGHT_DATE, dates[rng.integers(0, len(dates), rows)])
+    df.insert(2, Columns.TOTAL_WEIGHT, rng.integers(10, 20_000, rows).astype(str))
+    # 참조 데이터에 없는 공항도 조금 섞습니다 (병합 후 제외되는 행).
+    departures = rng.choice(airport_df["IATA"], size=rows).astype(object)
+    departures[rng.random(rows) < 0.01] = "XX0"
+    df.insert(3, Columns.DEPARTURE, departures)
+    df.to_parquet(data_dir / "fois-cargo" / "cargo_transfer.parquet", index=False)
+    return len(df)
+
+
+# --- Measurement ---
+def reset_peak_memory():
+    # 리눅스는 최대 RSS를 단계마다 초기화할 수 있습니다 (macOS는 프로세스 전체 최대값).
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def get_memory_mb(field):
+    """현재(VmRSS) 또는 최대(VmHWM) RSS (MB)"""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(results, stage, func):
+    reset_peak_memory()
+    before = get_memory_mb("VmRSS")
+    start = time.perf_counter()
+    value = func()
+    seconds = time.perf_counter() - start
+    peak = get_memory_mb("VmHWM")
+    rows = len(value) if isinstance(value, pd.DataFrame) else None
+    results.append({
+        "stage": stage,
+        "seconds": round(seconds, 4),
+        "peak_mb": round(peak, 1),
+        "delta_mb": round(max(peak - before, 0), 1),
+        "rows": rows,
+    })
+    return value
+
+
+def run_stages():
+    """DATA_DIR/CACHE_DIR 환경변수가 가리키는 데이터로 대시보드 단계를 차례로 실행 (빈 캐시 기준)
+
+    사이드바 위젯은 Streamlit 런타임 밖에서 기본값을 돌려주므로 페이지의 기본 화면과 같은 조건으로 측정됩니다.
+    """
+    from streamlit import logger
+
+    logger.set_log_level("error")  # 런타임 밖 실행 경고 생략
+
+    from config import COMPACT_STORAGE
+    from utils.backdata import (
+        build_cargo_cube,
+        build_cargo_kpi,
+        build_cargo_kpi_flights,
+        compact_cargo_frame,
+        load_cargo_data,
+        merge_cargo_data_with_ref,
+        read_aircraft_ref,
+        read_airline_ref,
+        read_airport_ref,
+    )
+    from utils.contents import (
+        AIRLINE_PAGE_KEYS,
+        ROUTE_PAGE_KEYS,
+        get_airline_ranking_frame,
+        make_cargo_airline_ranking_bar,
+        make_cargo_airline_treemap,
+        make_cargo_flow_map,
+        make_cargo_mapbox,
+        make_cargo_route_pie_chart,
+        make_cargo_treemap,
+    )
+    from utils.query import YEAR, CargoIndex, CargoKpi, PandasCargoQuery, QueryCache
+    from utils.sidebar import filter_by_cargo_airline, filter_by_cargo_route
+
+    results = []
+    refs = measure(results, "ref", lambda: (read_airline_ref(), read_airport_ref(), read_aircraft_ref()))
+    raw_df = measure(results, "load", load_cargo_data)
+    df = measure(results, "merge", lambda: merge_cargo_data_with_ref(raw_df, *refs).reset_index(drop=True))
+    del raw_df
+    if COMPACT_STORAGE:
+        df = measure(results, "compact", lambda: compact_cargo_frame(df))
+    cube = measure(results, "cube", lambda: build_cargo_cube(df))
+    kpi = measure(results, "kpi", lambda: build_cargo_kpi(df))
+    kpi_flights = measure(results, "kpi_flights", lambda: build_cargo_kpi_flights(df))
+    del df
+    query = PandasCargoQuery(CargoIndex(cube), QueryCache(), kpi=CargoKpi(kpi, kpi_flights))
+    # 전년 비교가 비지 않도록 마지막 연도를 기본 선택으로 둡니다.
+    years = sorted(query.options(YEAR), reverse=True)
+
+    # --- 노선 페이지 ---
+    route_query = measure(results, "route.filter", lambda: filter_by_cargo_route(query, years=years))
+    measure(results, "route.summary", route_query.summary)
+    route_df = measure(results, "route.aggregate", lambda: route_query.aggregate(ROUTE_PAGE_KEYS))
+    measure(results, "route.sunburst", lambda: make_cargo_route_pie_chart(route_df))
+    measure(results, "route.map", lambda: [make_cargo_mapbox(route_df, io=io, level="국가") for io in ["전", "후"]])
+    measure(results, "route.flow_map", lambda: make_cargo_flow_map(route_df))
+    measure(results, "route.treemap", lambda: make_cargo_treemap(route_df))
+
+    # --- 항공사 페이지 ---
+    airline_query, compare_query = measure(
+        results, "airline.filter", lambda: filter_by_cargo_airline(query, years=years)
+    )
+    measure(results, "airline.summary", airline_query.summary)
+    airline_df = measure(results, "airline.aggregate", lambda: airline_query.aggregate(AIRLINE_PAGE_KEYS))
+    compare_df = measure(results, "airline.compare", lambda: compare_query.aggregate(AIRLINE_PAGE_KEYS))
+    measure(results, "airline.treemap", lambda: make_cargo_airline_treemap(airline_df))
+    cols = [f"{Columns.ROUTE_NAME}_z", f"{Columns.COUNTRY_NAME}_z", f"{Columns.CITY_NAME}_z"]
+    ranking_df = measure(results, "airline.ranking", lambda: get_airline_ranking_frame(airline_df, compare_df, cols))
+    measure(results, "airline.ranking_bar", lambda: [make_cargo_airline_ranking_bar(ranking_df, col) for col in cols])
+    return results
+
+
+def run_scale(scale, args):
+    """scale배 데이터를 (없으면) 만들고 새 프로세스에서 빈 캐시로 단계를 측정"""
+    rows = int(args.rows * scale)
+    scale_dir = args.work_dir / f"rows-{rows}-seed-{args.seed}"
+    data_dir, cache_dir = scale_dir / "data", scale_dir / "cache"
+    generated = None
+    if args.regenerate or not (data_dir / "oag_ref.xlsx").exists():
+        shutil.rmtree(data_dir, ignore_errors=True)
+        start = time.perf_counter()
+        generate_cargo_data(data_dir, rows, seed=args.seed)
+        generated = round(time.perf_counter() - start, 1)
+
+    # 반복 측정은 단계별 최소 시간/최대 메모리를 씁니다 (다른 프로세스 부하로 인한 편차 제거).
+    stages = {}
+    env = dict(os.environ, DATA_DIR=str(data_dir), CACHE_DIR=str(cache_dir), DATA_MIRROR="0")
+    for _ in range(args.repeat):
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        completed = subprocess.run(
+            [sys.executable, __file__, "--run-stages"],
+            env=env,
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"❌ {scale:g}배 규모 측정 실패")
+        for stage in json.loads(completed.stdout.strip().splitlines()[-1]):
+            best = stages.setdefault(stage["stage"], stage)
+            best["seconds"] = min(best["seconds"], stage["seconds"])
+            best["peak_mb"] = max(best["peak_mb"], stage["peak_mb"])
+            best["delta_mb"] = max(best["delta_mb"], stage["delta_mb"])
+    return {"scale": scale, "rows": rows, "generated_seconds": generated, "stages": list(stages.values())}
+
+
+def print_result(result):
+    print(f"\n📊 {result['scale']:g}배 규모 ({result['rows']:,}행)")
+    print(f"   {'단계':<22}{'시간(초)':>10}{'최대(MB)':>11}{'증가(MB)':>11}{'결과 행':>12}")
+    for stage in result["stages"]:
+        rows = f"{stage['rows']:,}" if stage["rows"] is not None else "-"
+        print(
+            f"   {stage['stage']:<22}{stage['seconds']:>10.3f}{stage['peak_mb']:>11,.0f}"
+            f"{stage['delta_mb']:>11,.0f}{rows:>12}"
+        )
+    total = sum(stage["seconds"] for stage in result["stages"])
+    print(f"   {'합계':<22}{total:>10.3f}")
+
+
+def find_regressions(results, baseline, tolerance, min_seconds):
+    """기준 결과보다 tolerance 비율 이상, min_seconds 이상 느려진 (규모, 단계) 목록"""
+    base = {(r["rows"], s["stage"]): s["seconds"] for r in baseline for s in r["stages"]}
+    regressions = []
+    for result in results:
+        for stage in result["stages"]:
+            before = base.get((result["rows"], stage["stage"]))
+            if before is None:
+                continue
+            if stage["seconds"] > before * (1 + tolerance) and stage["seconds"] - before > min_seconds:
+                regressions.append((result["rows"], stage["stage"], before, stage["seconds"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 데이터로 대시보드 단계별 성능을 측정합니다.")
+    parser.add_argument("--scale", type=float, nargs="+", default=[1], help="데이터 규모 (1배 = --rows 행)")
+    parser.add_argument("--rows", type=int, default=BENCH_BASE_ROWS, help="1배 규모의 화물 행 수")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터 난수 시드")
+    parser.add_argument("--work-dir", type=Path, default=BENCH_WORK_DIR, help="합성 데이터/캐시 폴더")
+    parser.add_argument("--repeat", type=int, default=3, help="규모별 반복 측정 횟수 (단계별 최소 시간 사용)")
+    parser.add_argument("--regenerate", action="store_true", help="합성 데이터가 있어도 다시 생성")
+    parser.add_argument("--output", type=Path, default=None, help="측정 결과 JSON 저장 경로")
+    parser.add_argument("--baseline", type=Path, default=None, help="비교할 이전 측정 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="허용 지연 비율 (0.3 = 30%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.1, help="이보다 작은 지연은 무시 (초)")
+    parser.add_argument("--run-stages", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stages:
+        # run_scale이 띄운 측정 프로세스 - 마지막 줄에 결과를 JSON으로 출력합니다.
+        print(json.dumps(run_stages()))
+        return
+
+    results = []
+    for scale in args.scale:
+        print(f"⏱️ {scale:g}배 규모 측정 중...")
+        result = run_scale(scale, args)
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, ensure_ascii=False, indent=2))
+        print(f"\n✅ 저장 완료: {args.output}")
+    if args.baseline:
+        regressions = find_regressions(
+            results, json.loads(args.baseline.read_text()), args.tolerance, args.min_seconds
+        )
+        for rows, stage, before, after in regressions:
+            print(f"⚠️ {rows:,}행 {stage}: {before:.3f}초 → {after:.3f}초")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ 기준({args.baseline}) 대비 느려진 단계 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,37 @@ import os
 # File paths - NAS 환경변수 우선, 로컬 fallback
 DATA_DIR = Path(os.getenv("DATA_DIR", "/Volumes/teamflexa.synology.me/data"))
 CARGO_DATA_FILE = DATA_DIR / "fois-cargo" / "cargo_transfer.parquet"
+# ingest_cargo.py로 변환한 분석용 파일 (정렬/타입 변환 완료) - 있으면 CARGO_DATA_FILE 대신 사용
+CARGO_NORMALIZED_FILE = DATA_DIR / "fois-cargo" / "cargo_transfer_normalized.parquet"
+# 연/월 단위 hive 파티션 데이터셋 (year=2024/month=1/...) - 있으면 CARGO_DATA_FILE 대신 사용
+CARGO_DATASET_DIR = DATA_DIR / "fois-cargo" / "cargo_transfer"
 OAG_REF_FILE = DATA_DIR / "oag_ref.xlsx"
 
+# 로컬 캐시 - 컨테이너 재시작 후에도 유지되도록 프로젝트 폴더(/app) 아래에 둡니다.
+CACHE_DIR = Path(os.getenv("CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+# NAS 원본 로컬 사본 - 데이터 파일을 로컬 디스크에 복사해 두고 읽기는 사본에서 합니다 (0이면 NAS에서 직접 읽음).
+DATA_MIRROR = os.getenv("DATA_MIRROR", "1") != "0"
+DATA_MIRROR_DIR = Path(os.getenv("DATA_MIRROR_DIR", CACHE_DIR / "mirror"))
+# 메모리 절약 모드 - 코드/이름 컬럼은 category, 좌표는 float32, 중량은 kg 정수(int32), 운항일자는 date32로 보관 (0이면 끔)
+COMPACT_STORAGE = os.getenv("COMPACT_STORAGE", "1") != "0"
+# 원본 화물 파일 변경 확인 주기(초) - 새 운항일자가 있으면 추가분만 백그라운드에서 병합합니다.
+CARGO_REFRESH_INTERVAL = int(os.getenv("CARGO_REFRESH_INTERVAL", "60"))
+# 필터/집계 조회 엔진 - "pandas"(메모리의 데이터프레임) 또는 "duckdb"(병합 캐시 parquet를 디스크에서 직접 조회)
+QUERY_BACKEND = os.getenv("QUERY_BACKEND", "pandas")
+# 필터 결과/사이드바 선택지 캐시 용량(MB) - 데이터 버전별로 세션 간에 공유하며 초과하면 오래된 것부터 제거합니다.
+QUERY_CACHE_MB = int(os.getenv("QUERY_CACHE_MB", "256"))
+# 차트 그림 캐시 용량(MB) - 집계 데이터와 차트 옵션이 같으면 직렬화해 둔 그림을 세션 간에 재사용합니다.
+FIGURE_CACHE_MB = int(os.getenv("FIGURE_CACHE_MB", "64"))
+# 여러 Streamlit 프로세스가 같은 CACHE_DIR의 병합 데이터를 메모리 매핑으로 공유 (1이면 켬)
+SHARED_DATASET = os.getenv("SHARED_DATASET", "0") == "1"
+# 단계별 소요 시간 기록 (1이면 켬) - 관리자는 사이드바에서 보고, 실행마다 METRICS_FILE에 남깁니다.
+METRICS = os.getenv("METRICS", "0") == "1"
+# 기록 형식 - "jsonl"(단계마다 한 줄 추가) 또는 "prometheus"(페이지/단계별 누적값 텍스트, node_exporter textfile용)
+METRICS_FORMAT = os.getenv("METRICS_FORMAT", "jsonl")
+METRICS_FILE = Path(os.getenv(
+    "METRICS_FILE", CACHE_DIR / ("metrics.prom" if METRICS_FORMAT == "prometheus" else "metrics.jsonl")
+))
+
 # Column names
 class Columns:
     # 화물 데이터
@@ -92,6 +121,8 @@ class ChartConfig:
     MAP_HEIGHT = 400
     TREEMAP_HEIGHT = 600
     DEFAULT_ZOOM = 2
+    FLOW_TOP_N = 30  # 노선 흐름 지도에 그릴 상위 노선 수
+    FLOW_ARC_POINTS = 16  # 노선 하나를 그리는 대권 경로 점 수
     
 # Default filter settings
 class DefaultFilters:
@@ -99,3 +130,4 @@ class DefaultFilters:
     ARR_ROUTE_INDEX = 5  # 미주
     PIE_CHART_DEFAULTS = ["출발지역", "출발국가", "도착국가"]
     TREEMAP_DEFAULTS = ["여객/화물", "항공사명"]
+    MAP_LEVEL_INDEX = 1  # 국가
@@ -0,0 +1,59 @@
+"""화물 데이터 오프라인 변환 (ETL)
+
+cargo_transfer.parquet을 읽어 날짜 변환, 정렬, 중량 단위 변환을 미리 적용한 분석용 parquet을 만듭니다.
+대시보드는 이 파일이 있으면 서버 시작 시 변환 없이 바로 읽습니다.
+
+    uv run python ingest_cargo.py                 # fois-cargo/cargo_transfer_normalized.parquet 생성
+    uv run python ingest_cargo.py --partitioned   # fois-cargo/cargo_transfer/year=YYYY/month=M/ 생성
+"""
+import argparse
+import time
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from config import CARGO_DATA_FILE, CARGO_DATASET_DIR, CARGO_NORMALIZED_FILE
+from utils.backdata import (
+    CARGO_COLUMNS,
+    get_cargo_source_stamp,
+    normalize_cargo_data,
+    to_cargo_table,
+    write_cargo_dataset,
+    write_parquet_atomic,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="화물 데이터를 분석용 parquet으로 변환합니다.")
+    parser.add_argument("--source", type=Path, default=CARGO_DATA_FILE, help="원본 parquet 파일")
+    parser.add_argument("--output", type=Path, default=None, help="출력 경로 (파일 또는 파티션 폴더)")
+    parser.add_argument("--partitioned", action="store_true", help="year/month 파티션 데이터셋으로 저장")
+    parser.add_argument(
+        "--row-group-size", type=int, default=100_000, help="row group 크기 (운항일자 통계 단위)"
+    )
+    args = parser.parse_args()
+
+    start = time.time()
+    print(f"📦 원본 로드: {args.source}")
+    # 대시보드가 원본이 이후에 바뀌었는지 알 수 있도록 읽기 전의 원본 크기/수정시각을 함께 저장합니다.
+    source_stamp = get_cargo_source_stamp(args.source)
+    df = pq.read_table(args.source, columns=CARGO_COLUMNS).to_pandas()
+    print(f"   - 행 수: {len(df):,}")
+
+    # 날짜 변환, 운항일자/편명 정렬, 중량 kg -> 톤 (환적 X2)
+    df = normalize_cargo_data(df)
+
+    if args.partitioned:
+        output = args.output or CARGO_DATASET_DIR
+        write_cargo_dataset(df, output, source_stamp)
+    else:
+        output = args.output or CARGO_NORMALIZED_FILE
+        # 정렬된 상태로 저장하므로 row group별 운항일자 min/max 통계로 기간 필터 시 건너뛸 수 있습니다.
+        write_parquet_atomic(
+            to_cargo_table(df, source_stamp), output, row_group_size=args.row_group_size, write_statistics=True
+        )
+    print(f"✅ 저장 완료: {output} ({time.time() - start:.1f}초)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@ import streamlit as st
 
 from config import Columns
 from utils.backdata import *
+from utils.query import load_cargo_query
 from utils.sidebar import *
 from utils.contents import *
+from utils.metrics import start_metrics, finish_metrics
 from authentication import initialize_auth
 
 # 인증 시스템 초기화
@@ -18,6 +20,7 @@ if not auth_manager.is_logged_in():
         auth_manager.render_login()
 else:
     # Main application after successful login
+    start_metrics("Airline")  # METRICS=1일 때만 단계별 시간 기록
     load_css()
     
     # Add user info and logout button in sidebar
@@ -25,34 +28,39 @@ else:
         auth_manager.render_user_info()
 
     # --- Data Load ---
-    cargo_df = load_cargo_data()
-    compare_df = cargo_df.copy()
-    airport_ref = load_airport_ref()
-    airline_ref = load_airline_ref()
-    aircraft_ref = load_aircraft_ref()
+    # 전년 동기 비교를 위해 선택 연도와 직전 연도 파티션을 함께 읽습니다.
+    years = list_cargo_years()
+    cargo_query = load_cargo_query(get_selected_years(years, with_previous=True))
 
     # --------------------- SideBar Start ---------------------
-    cargo_df, compare_df = filter_by_cargo_airline(
-        cargo_df, airport_ref, airline_ref, aircraft_ref
-    )
+    cargo_query, compare_query = filter_by_cargo_airline(cargo_query, years=years or None)
     # --------------------- SideBar End ---------------------
 
     # --------------------- Contents Start ---------------------
-    make_cargo_airline_stream_text(cargo_df)
+    make_cargo_airline_stream_text(cargo_query)
     st.markdown("---")
     # --------------------- Contents End ---------------------
 
+    # 아래 차트들은 필터된 데이터를 한 번만 합산한 결과를 나눠 씁니다.
+    airline_df = cargo_query.aggregate(AIRLINE_PAGE_KEYS)
+    compare_df = compare_query.aggregate(AIRLINE_PAGE_KEYS)
+
     # --------------------- Contents Start ---------------------
     st.caption(f"주요 사용 기재")
-    fig = make_cargo_airline_treemap(cargo_df)
+    fig = make_cargo_airline_treemap(airline_df)
     st.plotly_chart(fig, use_container_width=True)
     # --------------------- Contents End ---------------------
 
     # --------------------- Contents Start ---------------------
-    for col in [f"{Columns.ROUTE_NAME}_z", f"{Columns.COUNTRY_NAME}_z", f"{Columns.CITY_NAME}_z"]:
-        fig, rank_df = make_cargo_airline_ranking_bar(cargo_df, compare_df, col)
+    ranking_cols = [f"{Columns.ROUTE_NAME}_z", f"{Columns.COUNTRY_NAME}_z", f"{Columns.CITY_NAME}_z"]
+    ranking_df = get_airline_ranking_frame(airline_df, compare_df, ranking_cols)
+    for col in ranking_cols:
+        fig, rank_df = make_cargo_airline_ranking_bar(ranking_df, col)
         st.caption(f"Top 20 순위 ({col.split('_')[0]} 기준)")
         st.plotly_chart(fig, use_container_width=True)
         st.caption(f" * (참고) 전체 데이터")
         st.dataframe(rank_df, use_container_width=True)
     # --------------------- Contents End ---------------------
+
+    # 관리자에게는 이번 실행의 단계별 소요 시간을 사이드바에 보여 줍니다.
+    finish_metrics(show_panel=auth_manager.is_admin())
@@ -0,0 +1,155 @@
+"""utils.backdata 집계 테스트
+
+    uv run --with pytest pytest
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_cargo import generate_cargo_data
+from config import Columns
+from utils.backdata import (
+    CARGO_CUBE_ROWS,
+    CARGO_KPI_FLIGHTS,
+    build_cargo_cube,
+    build_cargo_kpi,
+    build_cargo_kpi_flights,
+    compact_cargo_frame,
+    get_weight_tonnes,
+    read_ipc_mapped,
+    write_ipc_atomic,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# SHARED_DATASET 값만 바꿔 같은 데이터의 기본 화면 요약을 계산하는 스크립트 (설정은 import 시점에 읽힘)
+SUMMARY_SCRIPT = """
+import json
+from utils.query import YEAR, load_cargo_query
+
+query = load_cargo_query(None)
+airlines = query.options("항공사명")[:3]
+cases = [query, query.where(YEAR, 2024), query.where(YEAR, 2024).where("항공사명", airlines).previous_year()]
+print(json.dumps([
+    {key: str(value) if key in ("start", "end") else float(value) for key, value in case.summary().items()}
+    for case in cases
+]))
+"""
+
+
+def make_enriched_frame(rows=2000, seed=0):
+    """병합 테이블과 같은 키 컬럼의 작은 데이터 - 항공사명/공항/편명에 결측을 섞습니다."""
+    rng = np.random.default_rng(seed)
+
+    def pick(values, missing=0.0):
+        picked = rng.choice(np.array(values, dtype=object), size=rows)
+        picked[rng.random(rows) < missing] = None
+        return picked
+
+    df = pd.DataFrame({
+        Columns.FLIGHT_DATE: pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 20, rows), unit="D"),
+        Columns.FLIGHT_NUM: pick([f"KE{n:03d}" for n in range(30)], missing=0.02),
+        Columns.TOTAL_WEIGHT: rng.integers(1, 10_000, rows) / 1000 * 2,
+        Columns.DEPARTURE: pick(["ICN", "NRT", "HKG", "LAX"], missing=0.05),
+        Columns.ARRIVAL: pick(["ICN", "NRT", "HKG", "LAX"]),
+        Columns.AIRLINE: pick(["KE", "OZ", "CX"]),
+        Columns.AIRCRAFT_TYPE: pick(["77F", "74N", "333"]),
+        Columns.PASSENGER_CARGO: pick(["화물", "여객"]),
+        Columns.AIRLINE_NAME: pick(["Korean Air", "Asiana", "Cathay"], missing=0.1),
+        Columns.AIRLINE_COUNTRY: pick(["Korea", "Hong Kong"]),
+    })
+    for side in ["x", "y"]:
+        df[f"{Columns.ROUTE_NAME}_{side}"] = pick(["일본", "동남아", "미주"])
+        df[f"{Columns.COUNTRY_NAME}_{side}"] = pick(["Japan", "Korea", "United States"])
+        df[f"{Columns.CITY_NAME}_{side}"] = pick(["Tokyo", "Seoul", "Los Angeles"], missing=0.05)
+    return compact_cargo_frame(df.sort_values(Columns.FLIGHT_DATE, kind="stable").reset_index(drop=True))
+
+
+def test_compact_weight_is_exact():
+    tonnes = pd.Series(np.arange(1, 20_001) / 1000 * 2)
+    compact = compact_cargo_frame(pd.DataFrame({Columns.TOTAL_WEIGHT: tonnes}))
+    assert compact[Columns.TOTAL_WEIGHT].dtype == np.int32
+    np.testing.assert_array_equal(get_weight_tonnes(compact[Columns.TOTAL_WEIGHT]), tonnes.to_numpy())
+
+
+def map_shared(df, path):
+    # SHARED_DATASET에서 각 프로세스가 읽는 형태 (Arrow dictionary 컬럼)
+    write_ipc_atomic(df, path)
+    return read_ipc_mapped(path)
+
+
+def count_kpi_flights(kpi, flights):
+    """조각별 편명 목록으로 센 전체 (운항일자, 편명) 수"""
+    days = np.repeat(kpi[Columns.FLIGHT_DATE].astype(str).to_numpy(), kpi[CARGO_KPI_FLIGHTS].to_numpy())
+    return len(set(zip(days, flights[Columns.FLIGHT_NUM].astype(object).fillna("-"))))
+
+
+def test_kpi_on_shared_frame_with_null_keys(tmp_path):
+    df = make_enriched_frame()
+    shared = map_shared(df, tmp_path / "enriched.arrow")
+
+    kpi, shared_kpi = build_cargo_kpi(df), build_cargo_kpi(shared)
+    assert len(shared_kpi) == len(kpi) < len(df)
+    assert shared_kpi[Columns.TOTAL_WEIGHT].sum() == pytest.approx(get_weight_tonnes(df[Columns.TOTAL_WEIGHT]).sum())
+    assert shared_kpi[CARGO_KPI_FLIGHTS].tolist() == kpi[CARGO_KPI_FLIGHTS].tolist()
+
+    flights = build_cargo_kpi_flights(shared)
+    assert len(flights) == shared_kpi[CARGO_KPI_FLIGHTS].sum()
+    expected = len(df[[Columns.FLIGHT_DATE, Columns.FLIGHT_NUM]].drop_duplicates())
+    assert count_kpi_flights(shared_kpi, flights) == expected
+
+
+def test_cube_on_shared_frame_with_null_keys(tmp_path):
+    df = make_enriched_frame()
+    shared = map_shared(df, tmp_path / "enriched.arrow")
+
+    cube, shared_cube = build_cargo_cube(df), build_cargo_cube(shared)
+    assert len(shared_cube) == len(cube)
+    assert shared_cube[Columns.TOTAL_WEIGHT].sum() == pytest.approx(get_weight_tonnes(df[Columns.TOTAL_WEIGHT]).sum())
+    assert shared_cube[Columns.DEPARTURE].isna().any()
+    # 편명 없이 합산하고 중량은 float64로 더합니다.
+    assert Columns.FLIGHT_NUM not in shared_cube.columns
+    assert shared_cube[Columns.TOTAL_WEIGHT].dtype == np.float64
+    assert shared_cube[CARGO_CUBE_ROWS].sum() == len(df)
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    generate_cargo_data(data_dir, 5000, years=(2023, 2024))
+    return data_dir
+
+
+def run_summary(data_dir, cache_dir, shared):
+    env = dict(
+        os.environ,
+        DATA_DIR=str(data_dir),
+        CACHE_DIR=str(cache_dir),
+        DATA_MIRROR="0",
+        SHARED_DATASET="1" if shared else "0",
+        QUERY_BACKEND="pandas",
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", SUMMARY_SCRIPT], env=env, cwd=ROOT, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_summary_with_shared_dataset(data_dir, tmp_path):
+    # 합성 데이터에는 종료된 항공사가 있어 병합 후 항공사명이 빈 행(결측 키)이 생깁니다.
+    expected = run_summary(data_dir, tmp_path / "local", shared=False)
+    shared = run_summary(data_dir, tmp_path / "shared", shared=True)
+    assert [case["flights"] for case in shared] == [case["flights"] for case in expected]
+    for shared_case, expected_case in zip(shared, expected):
+        assert shared_case["start"] == expected_case["start"]
+        assert shared_case["end"] == expected_case["end"]
+        assert shared_case["weight"] == pytest.approx(expected_case["weight"])
+    # 두 번째 프로세스는 이미 내보낸 공유 파일을 매핑해서 같은 결과를 냅니다.
+    assert run_summary(data_dir, tmp_path / "shared", shared=True) == shared
@@ -0,0 +1,42 @@
+"""utils.contents 차트/표 테스트
+
+    uv run --with pytest pytest
+"""
+import numpy as np
+import pandas as pd
+
+from config import Columns
+from utils.contents import AIRLINE_PAGE_KEYS, get_airline_ranking_frame, make_cargo_airline_ranking_bar
+
+RANKING_COLS = [f"{Columns.ROUTE_NAME}_z", f"{Columns.COUNTRY_NAME}_z", f"{Columns.CITY_NAME}_z"]
+
+
+def make_airline_frame(rows):
+    """query.aggregate(AIRLINE_PAGE_KEYS)와 같은 형태 (키는 category, 중량은 float64)"""
+    rng = np.random.default_rng(len(rows))
+    df = pd.DataFrame(
+        {key: pd.Categorical([row[i] for row in rows]) for i, key in enumerate(AIRLINE_PAGE_KEYS)}
+    )
+    df[Columns.TOTAL_WEIGHT] = rng.integers(1, 1000, len(rows)).astype(np.float64)
+    return df
+
+
+def test_ranking_bar_with_empty_filter():
+    # 항공사와 그 항공사가 쓰지 않는 기종을 함께 고른 경우처럼 필터 결과가 비어 있음
+    empty = make_airline_frame([])
+    ranking_df = get_airline_ranking_frame(empty, empty, RANKING_COLS)
+    for col in RANKING_COLS:
+        fig, rank_df = make_cargo_airline_ranking_bar(ranking_df, col)
+        assert rank_df.empty
+        assert list(rank_df.columns) == [col, Columns.TOTAL_WEIGHT, "점유율(%)", "전년실적", "전년대비증가율(%)"]
+        assert fig is not None
+
+
+def test_ranking_bar_labels():
+    airline_df = make_airline_frame([("77F", "일본", "Japan", "Tokyo"), ("74N", "미주", "United States", "Los Angeles")])
+    compare_df = make_airline_frame([("77F", "일본", "Japan", "Tokyo")])
+    ranking_df = get_airline_ranking_frame(airline_df, compare_df, RANKING_COLS)
+    fig, rank_df = make_cargo_airline_ranking_bar(ranking_df, RANKING_COLS[0])
+    assert len(rank_df) == 2
+    assert rank_df.set_index(RANKING_COLS[0]).loc["미주", "전년대비증가율(%)"] == "No Data"
+    assert all(text.endswith("%)") for text in fig.data[0].text)
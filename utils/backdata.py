@@ -1,13 +1,60 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import hashlib
+import json
+import logging
+import os
+import threading
+import shutil
+import time
+from contextlib import contextmanager
+from collections import defaultdict, namedtuple
 from datetime import datetime
+from pathlib import Path
+from pandas.api.types import union_categoricals
 from config import (
     CARGO_DATA_FILE, 
+    CARGO_DATASET_DIR,
+    CARGO_NORMALIZED_FILE,
     OAG_REF_FILE, 
+    CACHE_DIR,
+    DATA_DIR,
+    DATA_MIRROR,
+    DATA_MIRROR_DIR,
+    COMPACT_STORAGE,
+    CARGO_REFRESH_INTERVAL,
+    SHARED_DATASET,
     Columns, 
+    ROUTE_MAPPING,
     REGION_CODE_MAPPING
 )
+from utils.metrics import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows - 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 병합 로직이 바뀌면 올려서 기존 디스크 캐시를 무효화합니다.
+ENRICHED_SCHEMA_VERSION = 4
+
+# 대시보드에서 사용하는 원본 컬럼 (나머지 컬럼은 읽지 않습니다)
+CARGO_COLUMNS = [
+    Columns.FLIGHT_DATE,
+    Columns.FLIGHT_NUM,
+    Columns.TOTAL_WEIGHT,
+    Columns.DEPARTURE,
+    Columns.ARRIVAL,
+    Columns.AIRLINE,
+    Columns.AIRCRAFT_TYPE,
+    Columns.PASSENGER_CARGO,
+]
 
 
 # --- CSS ---
@@ -23,10 +70,334 @@ def load_css():
     return st.markdown(css, unsafe_allow_html=True)
 
 
+# --- Local Mirror ---
+# NAS(DATA_DIR)의 원본을 로컬 디스크(DATA_MIRROR_DIR)에 복사해 두고 읽기는 로컬 사본에서 합니다.
+# 사본은 원본과 크기/수정시각이 같게 만들어 두므로 파일 지문(get_file_fingerprint)도 원본과 같습니다.
+_mirror_locks = defaultdict(threading.Lock)
+_mirror_checked_at = {}
+_mirror_synced = {}  # path: 마지막 동기화 성공 여부 (실패했고 사본도 없으면 NAS 경로를 읽음)
+_mirror_state_lock = threading.Lock()
+
+
+def get_mirror_path(path):
+    return DATA_MIRROR_DIR / Path(path).relative_to(DATA_DIR)
+
+
+def _is_mirror_current(source, local):
+    if not local.exists():
+        return False
+    source_stat, local_stat = source.stat(), local.stat()
+    return source_stat.st_size == local_stat.st_size and source_stat.st_mtime_ns == local_stat.st_mtime_ns
+
+
+def copy_to_mirror(source, local, chunk_size=1 << 20):
+    """원본을 임시 파일로 복사한 뒤 크기/수정시각/체크섬이 맞을 때만 사본을 교체"""
+    stat = source.stat()
+    local.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = local.with_name(f".{local.name}.{os.getpid()}.tmp")
+    digest = hashlib.sha256()
+    try:
+        with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                digest.update(chunk)
+                dst.write(chunk)
+        # 복사하는 동안 원본이 바뀌었으면(NAS에서 쓰는 중) 버리고 다음 확인 때 다시 복사합니다.
+        new_stat = source.stat()
+        if (new_stat.st_size, new_stat.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            raise OSError(f"{source} changed while mirroring")
+        if tmp_path.stat().st_size != stat.st_size or get_file_checksum(tmp_path) != digest.hexdigest():
+            raise OSError(f"Mirror copy of {source} does not match the source")
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, local)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+@timed
+def sync_mirror(path):
+    """원본 파일/폴더(하위 parquet)를 로컬 사본과 맞춤 - NAS에 접근할 수 없으면 기존 사본을 그대로 둡니다."""
+    source, local = Path(path), get_mirror_path(path)
+    if not DATA_DIR.exists():
+        logger.warning("%s is not reachable; serving the local mirror", DATA_DIR)
+        return
+    files = {file.relative_to(source): file for file in source.rglob("*.parquet")} if source.is_dir() else {}
+    if not source.exists() or (source.is_dir() and not files):
+        # 마운트가 비었거나 원본이 잠시 없는 경우일 수 있으므로 마지막 사본은 지우지 않습니다.
+        if local.exists():
+            logger.warning("%s is missing on %s; serving the last mirrored copy", source.name, DATA_DIR)
+        return
+    if not source.is_dir():
+        if not _is_mirror_current(source, local):
+            copy_to_mirror(source, local)
+            logger.info("Mirrored %s", source)
+        return
+    # 폴더는 읽는 중인 사본을 고치지 않고 새 버전 폴더를 만든 뒤 링크만 원자적으로 바꿉니다.
+    # 바뀌지 않은 파일은 이전 버전에서 하드 링크로 가져옵니다.
+    current = local.resolve() if local.exists() else None
+    changed = [name for name, file in files.items() if current is None or not _is_mirror_current(file, current / name)]
+    if current is not None and not changed and len(list(current.rglob("*.parquet"))) == len(files):
+        return
+    version = local.with_name(f".{local.name}.v{time.time_ns()}")
+    try:
+        for name, file in files.items():
+            if name in changed:
+                copy_to_mirror(file, version / name)
+            else:
+                (version / name).parent.mkdir(parents=True, exist_ok=True)
+                os.link(current / name, version / name)
+        _replace_with_link(version, local)
+    except BaseException:
+        shutil.rmtree(version, ignore_errors=True)
+        raise
+    # 직전 버전은 이미 목록을 읽은 쪽이 있을 수 있어 다음 교체 때 지웁니다.
+    for old_version in local.parent.glob(f".{local.name}.v*"):
+        if old_version not in (version, current):
+            shutil.rmtree(old_version, ignore_errors=True)
+    logger.info("Mirrored %d files of %s", len(changed), source)
+
+
+def _replace_with_link(target, link):
+    tmp_link = link.with_name(f".{link.name}.{os.getpid()}.link")
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(target.name, tmp_link)
+    if link.is_dir() and not link.is_symlink():
+        # 링크 방식 이전에 만든 사본(일반 폴더)은 버전 폴더로 옮긴 뒤 링크로 바꿉니다.
+        link.rename(link.with_name(f".{link.name}.v0"))
+    os.replace(tmp_link, link)
+
+
+def _sync_mirror_now(path):
+    try:
+        sync_mirror(path)
+        _mirror_synced[path] = True
+    except OSError:
+        logger.exception("Failed to mirror %s", path)
+        _mirror_synced[path] = False
+
+
+def _sync_mirror_worker(path):
+    lock = _mirror_locks[path]
+    if not lock.acquire(blocking=False):
+        return  # 이미 복사 중
+    try:
+        _sync_mirror_now(path)
+    finally:
+        lock.release()
+
+
+def _is_mirror_check_due(path):
+    now = time.monotonic()
+    with _mirror_state_lock:
+        if path in _mirror_checked_at and now - _mirror_checked_at[path] < CARGO_REFRESH_INTERVAL:
+            return False
+        _mirror_checked_at[path] = now
+        return True
+
+
+def get_data_path(path, sync=False):
+    """DATA_DIR 아래 원본의 읽기용 경로
+
+    NAS 변경 확인/복사는 CARGO_REFRESH_INTERVAL마다 백그라운드에서 하고 요청 스레드는 로컬 경로만 봅니다.
+    사본이 없으면 이 프로세스에서 처음 한 번만 복사를 기다립니다. 원본이 없어 사본도 없으면
+    (예: 원본만 쓰는 배포의 분석용 파일) 없는 로컬 경로를 돌려주고, 복사에 실패한 경우에만 NAS 경로를 돌려줍니다.
+    폴더는 링크가 가리키는 버전 폴더를 돌려주므로 읽는 도중에 백그라운드 복사로 내용이 바뀌지 않습니다.
+    sync: 백그라운드 작업에서 호출할 때 - 확인 주기가 되었으면 이 스레드에서 복사까지 마치고 돌려줍니다.
+    """
+    path = Path(path)
+    if not DATA_MIRROR:
+        return path
+    local = get_mirror_path(path)
+    if not local.exists() and path not in _mirror_synced:
+        with _mirror_locks[path]:
+            if path not in _mirror_synced:
+                _is_mirror_check_due(path)
+                _sync_mirror_now(path)
+    elif _is_mirror_check_due(path):
+        if sync:
+            with _mirror_locks[path]:
+                _sync_mirror_now(path)
+        else:
+            threading.Thread(target=_sync_mirror_worker, args=(path,), daemon=True).start()
+    if local.exists():
+        return local.resolve()
+    return local if _mirror_synced.get(path, True) else path
+
+
 # --- Raw Data ---
-@st.cache_resource
-def load_cargo_data():
-    df = pd.read_parquet(CARGO_DATA_FILE)
+# ingest_cargo.py가 분석용 파일의 schema 메타데이터에 기록하는 원본 파일 크기/수정시각
+CARGO_SOURCE_METADATA_KEY = b"cargo_source"
+_derived_cargo_checks = {}
+# 읽을 화물 데이터 종류 - NAS를 봐야 하므로 백그라운드에서만 갱신하고 요청 스레드는 마지막 결과만 씁니다.
+# 로컬 사본 폴더에도 저장해 두어 재시작 직후에도 NAS를 기다리지 않습니다.
+CARGO_SOURCE_STATE_FILE = DATA_MIRROR_DIR / ".cargo_source.json"
+_cargo_source = None
+_cargo_source_lock = threading.Lock()
+_cargo_source_refresh_lock = threading.Lock()
+
+
+def get_cargo_source_stamp(path):
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _get_raw_cargo_stamp():
+    # 원본은 비교용으로 stat만 하므로 사본을 만들지 않고 NAS 경로(접근할 수 없으면 기존 사본)를 봅니다 (백그라운드 확인용).
+    for path in [CARGO_DATA_FILE, get_mirror_path(CARGO_DATA_FILE) if DATA_MIRROR else None]:
+        if path is not None and path.exists():
+            return get_cargo_source_stamp(path)
+    return None
+
+
+def _is_derived_cargo_current(files, raw_stamp):
+    for file in files:
+        metadata = pq.read_schema(file).metadata or {}
+        if CARGO_SOURCE_METADATA_KEY in metadata:
+            if json.loads(metadata[CARGO_SOURCE_METADATA_KEY]) != raw_stamp:
+                return False
+        elif file.stat().st_mtime_ns < raw_stamp["mtime_ns"]:
+            # 원본 정보가 없는 파일(이전 버전 ingest)은 수정시각으로 비교합니다.
+            return False
+    return True
+
+
+def get_cargo_source():
+    """읽을 화물 데이터 종류 ("dataset" → "normalized" → "raw" 순서)
+
+    CARGO_REFRESH_INTERVAL마다 백그라운드에서 다시 확인하고(refresh_cargo_source) 마지막 결과를 돌려줍니다.
+    프로세스를 처음 시작할 때는 저장된 결과를 쓰고, 저장된 결과도 없을 때만 확인을 기다립니다.
+    """
+    global _cargo_source
+    with _cargo_source_lock:
+        if _cargo_source is None:
+            _cargo_source = _read_cargo_source_state()
+        if _cargo_source is None:
+            _is_mirror_check_due(CARGO_SOURCE_STATE_FILE)
+            _cargo_source = refresh_cargo_source()
+    if _is_mirror_check_due(CARGO_SOURCE_STATE_FILE):
+        threading.Thread(target=_refresh_cargo_source_worker, daemon=True).start()
+    return _cargo_source
+
+
+def _read_cargo_source_state():
+    if not DATA_MIRROR or not CARGO_SOURCE_STATE_FILE.exists():
+        return None
+    return json.loads(CARGO_SOURCE_STATE_FILE.read_text()).get("source")
+
+
+def _refresh_cargo_source_worker():
+    global _cargo_source
+    if not _cargo_source_refresh_lock.acquire(blocking=False):
+        return  # 이미 확인 중
+    try:
+        _cargo_source = refresh_cargo_source()
+    except Exception:
+        logger.exception("Failed to check the cargo data source")
+    finally:
+        _cargo_source_refresh_lock.release()
+
+
+def refresh_cargo_source():
+    """NAS의 원본과 분석용 파일을 확인해 읽을 종류를 정하고 저장 (get_cargo_source의 백그라운드 확인)"""
+    source = _find_cargo_source(_get_raw_cargo_stamp())
+    if source == "raw":
+        # 요청 스레드가 원본 복사를 기다리지 않도록 여기서 먼저 사본을 만듭니다.
+        get_data_path(CARGO_DATA_FILE, sync=True)
+    if DATA_MIRROR:
+        write_json_atomic({"source": source}, CARGO_SOURCE_STATE_FILE)
+    return source
+
+
+def _find_cargo_source(raw_stamp):
+    """쓸 수 있는 분석용 파일 종류 (없으면 "raw")
+
+    분석용 파일은 ingest 이후 원본이 바뀌지 않은 경우에만 씁니다. 원본보다 오래된 경우에는
+    경고를 남기고 원본을 읽습니다 (ingest_cargo.py를 다시 실행하면 다시 분석용 파일을 씁니다).
+    """
+    for source, data_path in [("dataset", CARGO_DATASET_DIR), ("normalized", CARGO_NORMALIZED_FILE)]:
+        path = get_data_path(data_path, sync=True)
+        if not path.exists():
+            continue
+        files = sorted(path.rglob("*.parquet")) if path.is_dir() else [path]
+        if not files:
+            continue
+        if raw_stamp is None:
+            return source
+        # 원본과 분석용 파일의 크기/수정시각이 그대로면 이전 비교 결과를 씁니다 (경고도 상태가 바뀔 때 한 번만).
+        key = (json.dumps(raw_stamp), [(str(file), get_cargo_source_stamp(file)) for file in files])
+        checked = _derived_cargo_checks.get(source)
+        if checked is None or checked[0] != key:
+            checked = _derived_cargo_checks[source] = (key, _is_derived_cargo_current(files, raw_stamp))
+            if not checked[1]:
+                logger.warning("%s is older than %s; reading the raw file (re-run ingest_cargo.py)", data_path, CARGO_DATA_FILE)
+        if checked[1]:
+            return source
+    return "raw"
+
+
+def list_cargo_years():
+    """연도 목록 - 파티션 데이터셋은 폴더명, 정규화 파일은 row group 통계 기준 (원본만 쓰면 빈 리스트)"""
+    source = get_cargo_source()
+    if source == "dataset":
+        dataset_dir = get_data_path(CARGO_DATASET_DIR)
+        return sorted(int(p.name.split("=")[1]) for p in dataset_dir.glob("year=*") if p.is_dir())
+    if source == "normalized":
+        metadata = pq.ParquetFile(get_data_path(CARGO_NORMALIZED_FILE)).metadata
+        col_index = metadata.schema.to_arrow_schema().get_field_index(Columns.FLIGHT_DATE)
+        years = set()
+        for i in range(metadata.num_row_groups):
+            stats = metadata.row_group(i).column(col_index).statistics
+            if stats is not None and stats.has_min_max:
+                years.update(range(stats.min.year, stats.max.year + 1))
+        return sorted(years)
+    return []
+
+
+def get_cargo_source_files(years=None):
+    source = get_cargo_source()
+    if source == "dataset":
+        dataset_dir = get_data_path(CARGO_DATASET_DIR)
+        dirs = [dataset_dir / f"year={year}" for year in years] if years else [dataset_dir]
+        return sorted(path for d in dirs for path in d.rglob("*.parquet"))
+    if source == "normalized":
+        return [get_data_path(CARGO_NORMALIZED_FILE)]
+    return [get_data_path(CARGO_DATA_FILE)]
+
+
+def read_cargo_dataset(years=None, columns=CARGO_COLUMNS):
+    # year/month 파티션 중 필요한 것만, 필요한 컬럼만 읽습니다.
+    dataset = ds.dataset(get_data_path(CARGO_DATASET_DIR), format="parquet", partitioning="hive")
+    filter_expr = ds.field("year").isin(list(years)) if years else None
+    return dataset.to_table(columns=columns, filter=filter_expr)
+
+
+def read_normalized_cargo_file(years=None, columns=CARGO_COLUMNS):
+    # 운항일자로 정렬되어 있으므로 row group 통계로 선택 연도 밖의 구간은 건너뜁니다.
+    dataset = ds.dataset(get_data_path(CARGO_NORMALIZED_FILE), format="parquet")
+    filter_expr = None
+    for year in years or []:
+        year_expr = (ds.field(Columns.FLIGHT_DATE) >= pa.scalar(datetime(year, 1, 1).date())) & (
+            ds.field(Columns.FLIGHT_DATE) < pa.scalar(datetime(year + 1, 1, 1).date())
+        )
+        filter_expr = year_expr if filter_expr is None else filter_expr | year_expr
+    return dataset.to_table(columns=columns, filter=filter_expr)
+
+
+def read_cargo_table(years=None, columns=CARGO_COLUMNS):
+    source = get_cargo_source()
+    if source == "dataset":
+        return read_cargo_dataset(years, columns)
+    if source == "normalized":
+        return read_normalized_cargo_file(years, columns)
+    return pq.read_table(get_data_path(CARGO_DATA_FILE), columns=columns)
+
+
+def is_normalized_cargo_table(table):
+    # ingest_cargo.py로 정규화된 데이터는 운항일자가 date32 타입입니다 (원본은 문자열)
+    return pa.types.is_date(table.schema.field(Columns.FLIGHT_DATE).type)
+
+
+def normalize_cargo_data(df):
+    """원본 화물 데이터를 분석용으로 변환 (날짜 변환, 정렬, 중량 단위 변환)"""
     # 날짜 형식 정리 및 변환
     df[Columns.FLIGHT_DATE] = df[Columns.FLIGHT_DATE].str.replace("-", "")
     df[Columns.FLIGHT_DATE] = pd.to_datetime(df[Columns.FLIGHT_DATE], format="%Y%m%d")
@@ -38,30 +409,188 @@ def load_cargo_data():
     return df
 
 
+def to_cargo_table(df, source_stamp=None):
+    """정규화된 화물 데이터를 저장용 Arrow 테이블로 변환 (운항일자는 date32)
+
+    source_stamp: 변환한 원본의 크기/수정시각 (get_cargo_source_stamp) - 원본이 바뀌었는지 비교하는 데 씁니다.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    col_index = table.schema.get_field_index(Columns.FLIGHT_DATE)
+    table = table.set_column(
+        col_index, Columns.FLIGHT_DATE, table.column(col_index).cast(pa.timestamp("ns")).cast(pa.date32())
+    )
+    return _with_source_stamp(table, source_stamp)
+
+
+def _with_source_stamp(table, source_stamp):
+    if source_stamp is None:
+        return table
+    metadata = dict(table.schema.metadata or {})
+    metadata[CARGO_SOURCE_METADATA_KEY] = json.dumps(source_stamp).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def write_cargo_dataset(df, root=CARGO_DATASET_DIR, source_stamp=None):
+    """화물 데이터를 year=YYYY/month=M 파티션으로 저장 (해당 연/월 파티션은 교체)"""
+    if pd.api.types.is_datetime64_any_dtype(df[Columns.FLIGHT_DATE]):
+        flight_date = df[Columns.FLIGHT_DATE]
+        table = to_cargo_table(df, source_stamp)
+    else:
+        flight_date = pd.to_datetime(df[Columns.FLIGHT_DATE].str.replace("-", ""), format="%Y%m%d")
+        table = _with_source_stamp(pa.Table.from_pandas(df, preserve_index=False), source_stamp)
+    table = table.append_column("year", pa.array(flight_date.dt.year, pa.int32()))
+    table = table.append_column("month", pa.array(flight_date.dt.month, pa.int32()))
+    pq.write_to_dataset(
+        table,
+        root,
+        partition_cols=["year", "month"],
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+
+
+# 병합 테이블 생성에만 쓰이므로 원본은 따로 캐시해 두지 않습니다.
+@timed
+def load_cargo_data(years=None):
+    """원본 화물 데이터 로드
+
+    years: 읽을 연도 목록 (None이면 전체)
+    """
+    table = read_cargo_table(years)
+    if is_normalized_cargo_table(table):
+        df = table.to_pandas(date_as_object=False)
+        df[Columns.FLIGHT_DATE] = df[Columns.FLIGHT_DATE].astype("datetime64[ns]")
+        # 파티션 폴더는 사전순(month=10 < month=2)으로 읽히므로 이 경우에만 다시 정렬합니다.
+        if not df[Columns.FLIGHT_DATE].is_monotonic_increasing:
+            df = df.sort_values(by=[Columns.FLIGHT_DATE, Columns.FLIGHT_NUM]).reset_index(drop=True)
+    else:
+        df = normalize_cargo_data(table.to_pandas())
+    return df
+
+
+def get_cargo_fingerprint(df):
+    """원본 행 지문 - (행 수, 행별 해시의 합)이라 행 순서와 무관하고, 어느 행의 값이 바뀌어도 달라집니다."""
+    hashes = pd.util.hash_pandas_object(df[CARGO_COLUMNS], index=False).to_numpy()
+    return f"{len(hashes)}:{int(hashes.sum(dtype=np.uint64)):016x}"
+
+
+# --- Reference Data Cache ---
+# oag_ref.xlsx는 시트별로 parquet 사이드카로 변환해 두고, 워크북이 바뀐 경우에만 다시 읽습니다.
+REF_CACHE_DIR = CACHE_DIR / "ref"
+REF_SHEETS = {
+    "Airport Code": [
+        Columns.IATA,
+        Columns.AIRPORT_NAME,
+        Columns.CITY_NAME,
+        Columns.COUNTRY_NAME,
+        Columns.REGION_NAME,
+        "Region Code",
+        Columns.LONGITUDE,
+        Columns.LATITUDE,
+    ],
+    "Airline Code": [
+        Columns.IATA,
+        Columns.AIRLINE_NAME_ORIG,
+        Columns.COUNTRY_NAME_ORIG,
+        "Eff From",
+        "Eff To",
+    ],
+    "Aircraft Code": [Columns.IATA, "Manufacturer", "Acft Name", "Cat Name", "Class"],
+}
+_ref_cache_lock = threading.Lock()
+
+
+def get_file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_ref_cache_file(sheet_name):
+    return REF_CACHE_DIR / f"{sheet_name.lower().replace(' ', '_')}.parquet"
+
+
+def _normalize_ref_sheet(df, columns):
+    df = df[columns]
+    # 숫자/문자가 섞인 코드 컬럼(예: 기종 333, 74N)은 parquet으로 저장할 수 없어 문자열로 통일
+    for col in df.columns:
+        if pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+@contextmanager
+def ref_cache_lock():
+    """참조 캐시 변환 잠금 - 같은 CACHE_DIR을 공유하는 다른 프로세스(복제본)와도 한 번만 변환합니다."""
+    with _ref_cache_lock:
+        if fcntl is None:
+            yield
+            return
+        REF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(REF_CACHE_DIR / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _is_ref_cache_valid(path, manifest_file):
+    if not manifest_file.exists() or not all(get_ref_cache_file(s).exists() for s in REF_SHEETS):
+        return False
+    manifest = json.loads(manifest_file.read_text())
+    stat = Path(path).stat()
+    if manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+        return True
+    # 수정시각만 바뀐 경우(복사/동기화 등) 내용이 같으면 다시 변환하지 않습니다.
+    if manifest.get("sha256") == get_file_checksum(path):
+        manifest.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        write_json_atomic(manifest, manifest_file)
+        return True
+    return False
+
+
+@timed
+def build_ref_cache(path=OAG_REF_FILE):
+    """oag_ref.xlsx의 세 시트를 parquet 사이드카로 저장 (ref_cache_lock 안에서 호출)"""
+    stat = Path(path).stat()
+    # 워크북은 한 번만 열어 세 시트를 함께 파싱합니다 (시트마다 열면 압축 해제/공유 문자열 파싱이 반복됨).
+    sheets = pd.read_excel(path, sheet_name=list(REF_SHEETS))
+    for sheet_name, columns in REF_SHEETS.items():
+        df = _normalize_ref_sheet(sheets[sheet_name], columns)
+        write_parquet_atomic(df, get_ref_cache_file(sheet_name))
+    manifest = {
+        "source": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": get_file_checksum(path),
+    }
+    write_json_atomic(manifest, REF_CACHE_DIR / "manifest.json")
+
+
+@timed
+def read_ref_sheet(sheet_name, path=OAG_REF_FILE):
+    path = get_data_path(path)
+    with ref_cache_lock():
+        if not _is_ref_cache_valid(path, REF_CACHE_DIR / "manifest.json"):
+            build_ref_cache(path)
+    return pd.read_parquet(get_ref_cache_file(sheet_name))
+
+
 # --- Reference Data ---
-@st.cache_resource
-def load_airport_ref():
-    df = pd.read_excel(OAG_REF_FILE, sheet_name="Airport Code")
-    df = df[
-        [
-            Columns.IATA,
-            Columns.AIRPORT_NAME,
-            Columns.CITY_NAME,
-            Columns.COUNTRY_NAME,
-            Columns.REGION_NAME,
-            "Region Code",
-            Columns.LONGITUDE,
-            Columns.LATITUDE,
-        ]
-    ]
+def read_airport_ref():
+    df = read_ref_sheet("Airport Code")
     df["SubRegion Name"] = df["Region Code"].map(REGION_CODE_MAPPING)
     df.drop(["Region Code"], axis=1, inplace=True)
+    # 노선명은 참조 데이터를 읽을 때 한 번만 계산합니다 (캐시된 참조 데이터는 이후 수정하지 않음)
+    df[Columns.ROUTE_NAME] = get_airport_route_names(df, route_dict=ROUTE_MAPPING)
     return df
 
 
-@st.cache_resource
-def load_airline_ref():
-    df = pd.read_excel(OAG_REF_FILE, sheet_name="Airline Code")
+def read_airline_ref():
+    df = read_ref_sheet("Airline Code")
     df = df[df[Columns.IATA].notnull()]
     df["Eff To"] = df["Eff To"].apply(
         lambda x: x.replace(year=x.year + 100) if x.year == 1938 else x
@@ -75,9 +604,514 @@ def load_airline_ref():
     return df
 
 
+def read_aircraft_ref():
+    df = read_ref_sheet("Aircraft Code")
+    df[Columns.IATA] = df[Columns.IATA].astype(str)
+    return df
+
+
+@st.cache_resource
+def load_airport_ref():
+    return read_airport_ref()
+
+
+@st.cache_resource
+def load_airline_ref():
+    return read_airline_ref()
+
+
 @st.cache_resource
 def load_aircraft_ref():
-    df = pd.read_excel(OAG_REF_FILE, sheet_name="Aircraft Code")
-    df = df[[Columns.IATA, "Manufacturer", "Acft Name", "Cat Name", "Class"]]
-    df[Columns.IATA] = df[Columns.IATA].astype(str)
+    return read_aircraft_ref()
+
+
+# --- Enriched Data ---
+def get_airport_route_names(df, route_dict={}):
+    """공항별 노선명 - 국가/세부지역/지역 중 route_dict 순서상 먼저 나오는 키의 노선명 (없으면 기타)"""
+    order = {key: rank for rank, key in enumerate(route_dict)}
+    ranks = np.fmin.reduce([
+        df[col].astype(object).map(order).to_numpy(dtype=float)
+        for col in ["Country Name", "SubRegion Name", "Region Name"]
+    ])
+    ranks = np.where(np.isnan(ranks), len(route_dict), ranks).astype(int)
+    routes = np.array(list(route_dict.values()) + ["기타"], dtype=object)
+    return pd.Series(routes[ranks], index=df.index)
+
+
+def merge_cargo_data_with_ref(df, airline_ref, airport_ref, aircraft_ref):
+    # 항공사 정보 병합
+    df = pd.merge(df, airline_ref, on=Columns.AIRLINE, how="left")
+    
+    # 항공기 정보 병합
+    df = pd.merge(df, aircraft_ref, left_on=Columns.AIRCRAFT_TYPE, right_on=Columns.IATA, how="left")
+    df.drop([Columns.IATA], axis=1, inplace=True)
+    
+    # 공항 참조 데이터 (노선명은 read_airport_ref에서 계산됨)
+    airport_ref_cols = [
+        Columns.IATA,
+        Columns.CITY_NAME,
+        Columns.COUNTRY_NAME,
+        Columns.REGION_NAME,
+        Columns.ROUTE_NAME,
+        Columns.LONGITUDE,
+        Columns.LATITUDE,
+    ]
+    airport_ref = airport_ref[airport_ref_cols]
+    
+    # 출발지 공항 정보 병합
+    df = pd.merge(df, airport_ref, left_on=Columns.DEPARTURE, right_on=Columns.IATA, how="left", suffixes=("", "_dep"))
+    
+    # 도착지 공항 정보 병합
+    df = pd.merge(df, airport_ref, left_on=Columns.ARRIVAL, right_on=Columns.IATA, how="left", suffixes=("_x", "_y"))
+    
+    # 경로 조합 컬럼 생성
+    for col in [Columns.IATA, Columns.CITY_NAME, Columns.COUNTRY_NAME, Columns.REGION_NAME, Columns.ROUTE_NAME]:
+        if f"{col}_x" in df.columns and f"{col}_y" in df.columns:
+            df[f"{col}_z"] = df[f"{col}_x"] + " - " + df[f"{col}_y"]
+    
+    # 완전한 경로 데이터만 필터링
+    df = df[df[f"{Columns.REGION_NAME}_x"].notnull() & df[f"{Columns.REGION_NAME}_y"].notnull()]
+    return df
+
+
+def get_file_fingerprint(path):
+    stat = Path(path).stat()
+    return f"{Path(path).name}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def get_source_version(years=None):
+    """원본 화물 파일들의 크기/수정시각으로 버전 키 생성"""
+    key = "|".join(get_file_fingerprint(p) for p in get_cargo_source_files(years))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def get_ref_version():
+    return get_file_fingerprint(get_data_path(OAG_REF_FILE))
+
+
+def get_enriched_format():
+    # 병합 로직이나 저장 형식이 바뀌면 디스크 캐시를 다시 만듭니다.
+    return f"v{ENRICHED_SCHEMA_VERSION}:compact={COMPACT_STORAGE}"
+
+
+def get_cache_scope(years=None):
+    return "-".join(map(str, sorted(years))) if years else "all"
+
+
+# 메모리 절약 모드의 중량 단위 - 원본이 kg 정수라 톤 값(kg × 2 / 1000)을 kg 정수로 되돌리면 손실 없이 int32에 들어갑니다.
+WEIGHT_KG_PER_TONNE = 1000
+
+
+def to_weight_kg(series):
+    """톤 단위 중량을 kg 정수(int32)로 변환 (결측은 0)"""
+    kg = (series.fillna(0) * WEIGHT_KG_PER_TONNE).round()
+    if len(kg) and kg.abs().max() > np.iinfo(np.int32).max:
+        raise ValueError(f"Weight does not fit in int32 kg: {kg.abs().max() / WEIGHT_KG_PER_TONNE} t")
+    return kg.astype("int32")
+
+
+def get_weight_tonnes(series):
+    """병합 테이블의 중량을 톤 단위 float64 배열로 (kg 정수로 보관된 경우 여기서 변환)"""
+    values = series.fillna(0).to_numpy(dtype=np.float64)
+    if pd.api.types.is_integer_dtype(series):
+        return values / WEIGHT_KG_PER_TONNE
+    return values
+
+
+def compact_cargo_frame(df):
+    """문자열 컬럼은 category, 좌표 등 실수 컬럼은 float32, 운항일자는 date32, 중량은 kg 정수(int32)로 변환
+
+    중량은 float32로 줄이면 합계/점유율/전년 대비 값이 바뀌므로 kg 정수로 정확하게 보관하고
+    집계할 때 톤으로 바꿉니다 (get_weight_tonnes).
+    """
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col == Columns.FLIGHT_DATE:
+            series = series.astype(pd.ArrowDtype(pa.date32()))
+        elif col == Columns.TOTAL_WEIGHT:
+            series = to_weight_kg(series)
+        elif pd.api.types.is_float_dtype(series):
+            series = series.astype("float32")
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            series = series.astype("category")
+        columns[col] = series
+    return pd.DataFrame(columns)
+
+
+def write_parquet_atomic(df, path, **kwargs):
+    # 다른 프로세스가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    if isinstance(df, pa.Table):
+        pq.write_table(df, tmp_path, **kwargs)
+    else:
+        df.to_parquet(tmp_path, index=False, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(data, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def write_ipc_atomic(df, path):
+    """Arrow IPC 파일로 저장 (압축 없음 - 여러 프로세스가 메모리 매핑으로 공유)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_ipc_mapped(path):
+    """Arrow IPC 파일을 읽기 전용으로 매핑 - Arrow 타입 그대로 두어 복사 없이 페이지 캐시를 공유합니다."""
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def get_pandas_frame(df):
+    """공유 메모리(SHARED_DATASET)에서 매핑한 Arrow 타입 결과를 pandas 기본 타입(category 등)으로 변환"""
+    if not any(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes):
+        return df
+    # 운항일자(date32)는 메모리 절약 모드와 같이 Arrow 타입으로 둡니다.
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    return table.to_pandas(
+        types_mapper=lambda arrow_type: pd.ArrowDtype(arrow_type) if pa.types.is_date32(arrow_type) else None
+    )
+
+
+def concat_cargo_frames(frames):
+    """병합 테이블 이어붙이기 - category 컬럼은 범주를 합쳐 object로 바뀌지 않게 합니다."""
+    frames = [f for f in frames if len(f)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+    for col in frames[0].select_dtypes("category").columns:
+        categories = union_categoricals([f[col] for f in frames]).categories
+        frames = [f.assign(**{col: f[col].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+@timed
+def enrich_cargo_data(df, airline_ref, airport_ref, aircraft_ref):
+    df = merge_cargo_data_with_ref(df, airline_ref, airport_ref, aircraft_ref).reset_index(drop=True)
+    if COMPACT_STORAGE:
+        df = compact_cargo_frame(df)
     return df
+
+
+# --- Enriched Data Store ---
+# 병합 테이블에서 파생되는 집계 - {이름: (build(df), combine(기존 집계, 추가분 집계))}
+CARGO_AGGREGATES = {}
+
+
+def register_cargo_aggregate(name, build, combine):
+    """병합 테이블 파생 집계 등록 - 새 운항일자가 추가되면 추가분만 build해서 combine으로 합칩니다."""
+    CARGO_AGGREGATES[name] = (build, combine)
+
+
+# derived: snapshot 데이터로 한 번 만드는 파생 객체 (필터 인덱스 등) - 갱신되면 새 snapshot에서 다시 만듭니다.
+CargoSnapshot = namedtuple("CargoSnapshot", ["df", "aggregates", "manifest", "derived"])
+
+
+class EnrichedCargoStore:
+    """연도 범위별 병합 테이블
+
+    디스크(CACHE_DIR/enriched/<범위>/)에 part 파일들과 manifest로 저장되고,
+    원본에 새 운항일자가 추가되면 워터마크(마지막 운항일자) 이후분만 병합해 part로 덧붙입니다.
+    갱신은 백그라운드에서 진행되며 기존 세션은 이전 snapshot을 그대로 사용합니다.
+    in_memory=False이면 디스크의 part 파일만 최신으로 유지합니다 (DuckDB 백엔드용).
+    SHARED_DATASET이면 병합 테이블과 데이터프레임 집계를 Arrow IPC 파일로 내보내고 메모리 매핑으로 읽어
+    같은 CACHE_DIR을 쓰는 여러 Streamlit 프로세스가 한 벌의 메모리를 공유합니다.
+    """
+
+    def __init__(self, years=None, in_memory=True):
+        self.years = years
+        self.in_memory = in_memory
+        self.shared = SHARED_DATASET and in_memory
+        self.cache_dir = CACHE_DIR / "enriched" / get_cache_scope(years)
+        self.lock = threading.Lock()
+        self.refreshing = False
+        self.checked_at = time.monotonic()
+        self.snapshot = self._load()
+
+    # --- 조회 ---
+    def get_snapshot(self):
+        if time.monotonic() - self.checked_at >= CARGO_REFRESH_INTERVAL:
+            self.checked_at = time.monotonic()
+            self.refresh_in_background()
+        return self.snapshot
+
+    def get_parquet_files(self, snapshot=None):
+        manifest = (snapshot or self.get_snapshot()).manifest
+        return [self.cache_dir / part for part in manifest["parts"]]
+
+    def get_aggregate(self, name, snapshot=None):
+        snapshot = snapshot or self.get_snapshot()
+        if name not in snapshot.aggregates:
+            build, _ = CARGO_AGGREGATES[name]
+            shared_file = self._get_shared_file(name, snapshot.manifest)
+            if self.shared and shared_file.exists():
+                value = read_ipc_mapped(shared_file)
+            else:
+                value = build(snapshot.df)
+                if self.shared and isinstance(value, pd.DataFrame):
+                    value = self._share(name, snapshot.manifest, lambda manifest: value)
+            snapshot.aggregates[name] = value
+        return snapshot.aggregates[name]
+
+    def get_derived(self, name, build, snapshot=None):
+        """build(snapshot) 결과를 snapshot별로 한 번만 계산"""
+        snapshot = snapshot or self.get_snapshot()
+        if name not in snapshot.derived:
+            snapshot.derived[name] = build(snapshot)
+        return snapshot.derived[name]
+
+    # --- 갱신 ---
+    def refresh_in_background(self):
+        with self.lock:
+            if self.refreshing or get_source_version(self.years) == self.snapshot.manifest["source_version"]:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh_worker, daemon=True).start()
+
+    def _refresh_worker(self):
+        try:
+            self.snapshot = self._refresh(self.snapshot)
+        except Exception:
+            logger.exception("Failed to refresh enriched cargo data (%s)", self.cache_dir.name)
+        finally:
+            self.refreshing = False
+
+    def _load(self):
+        manifest = self._read_manifest()
+        if manifest and manifest["format"] == get_enriched_format() and manifest["ref_version"] == get_ref_version():
+            parts = [self.cache_dir / part for part in manifest["parts"]]
+            if not all(part.exists() for part in parts):
+                return self._build_full()
+            if self.shared:
+                # 다른 프로세스가 이미 내보낸 버전이 있으면 part를 읽지 않고 바로 매핑합니다.
+                df = self._share("enriched", manifest, self._read_parts)
+            else:
+                df = self._read_parts(manifest) if self.in_memory else None
+            snapshot = CargoSnapshot(df, {}, manifest, {})
+            # 서버가 꺼져 있는 동안 추가된 운항일자는 시작할 때 바로 반영합니다.
+            if get_source_version(self.years) != manifest["source_version"]:
+                snapshot = self._refresh(snapshot)
+            return snapshot
+        return self._build_full()
+
+    def _refresh(self, snapshot):
+        manifest = snapshot.manifest
+        if manifest["ref_version"] != get_ref_version() or manifest["watermark"] is None:
+            return self._build_full()
+        watermark = pd.Timestamp(manifest["watermark"])
+        source_version = get_source_version(self.years)
+        all_df = load_cargo_data(self.years)
+
+        # 워터마크 이전 행이 하나라도 바뀌었으면(재적재/수정/삭제) 추가분만으로는 맞출 수 없습니다.
+        is_new = all_df[Columns.FLIGHT_DATE] > watermark
+        if get_cargo_fingerprint(all_df[~is_new]) != manifest.get("raw_fingerprint"):
+            return self._build_full(all_df)
+
+        raw_df = all_df[is_new].reset_index(drop=True)
+        manifest = dict(manifest, source_version=source_version)
+        if len(raw_df) == 0:
+            self._write_manifest(manifest)
+            return snapshot._replace(manifest=manifest)
+
+        delta_df = enrich_cargo_data(raw_df, read_airline_ref(), read_airport_ref(), read_aircraft_ref())
+        new_watermark = raw_df[Columns.FLIGHT_DATE].max()
+        part = f"part-{new_watermark:%Y%m%d}.parquet"
+        write_parquet_atomic(delta_df, self.cache_dir / part)
+        manifest.update(
+            parts=manifest["parts"] + [part],
+            watermark=new_watermark.isoformat(),
+            raw_fingerprint=get_cargo_fingerprint(all_df),
+        )
+        self._write_manifest(manifest)
+
+        aggregates = {}
+        if self.shared:
+            # 공유 모드는 part 전체로 새 버전을 내보내고 집계는 처음 조회할 때 다시 만듭니다.
+            df = self._share("enriched", manifest, self._read_parts)
+            logger.info("Appended %d rows after %s to %s", len(delta_df), watermark.date(), self.cache_dir.name)
+            return CargoSnapshot(df, aggregates, manifest, {})
+        for name, value in list(snapshot.aggregates.items()):
+            build, combine = CARGO_AGGREGATES[name]
+            aggregates[name] = combine(value, build(delta_df))
+        df = concat_cargo_frames([snapshot.df, delta_df]) if self.in_memory else None
+        logger.info("Appended %d rows after %s to %s", len(delta_df), watermark.date(), self.cache_dir.name)
+        return CargoSnapshot(df, aggregates, manifest, {})
+
+    def _build_full(self, raw_df=None):
+        source_version = get_source_version(self.years)
+        ref_version = get_ref_version()
+        if raw_df is None:
+            raw_df = load_cargo_data(self.years)
+        df = enrich_cargo_data(raw_df, read_airline_ref(), read_airport_ref(), read_aircraft_ref())
+        watermark = raw_df[Columns.FLIGHT_DATE].max() if len(raw_df) else None
+
+        part = "part-base.parquet"
+        write_parquet_atomic(df, self.cache_dir / part)
+        manifest = {
+            "format": get_enriched_format(),
+            "ref_version": ref_version,
+            "source_version": source_version,
+            "watermark": watermark.isoformat() if watermark is not None else None,
+            "raw_fingerprint": get_cargo_fingerprint(raw_df),
+            "parts": [part],
+        }
+        self._write_manifest(manifest)
+        for old_part in self.cache_dir.glob("part-*.parquet"):
+            if old_part.name != part:
+                old_part.unlink(missing_ok=True)
+
+        # 참조 데이터가 바뀐 경우 차트에서 쓰는 참조 데이터 캐시도 비웁니다.
+        for loader in [load_airport_ref, load_airline_ref, load_aircraft_ref]:
+            loader.clear()
+        if self.shared:
+            df = self._share("enriched", manifest, lambda manifest: df)
+        return CargoSnapshot(df if self.in_memory else None, {}, manifest, {})
+
+    def _read_parts(self, manifest):
+        return concat_cargo_frames([pd.read_parquet(self.cache_dir / part) for part in manifest["parts"]])
+
+    # --- 공유 메모리 ---
+    def _get_shared_file(self, name, manifest):
+        version = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+        return self.cache_dir / f"{name}-{version}.arrow"
+
+    def _share(self, name, manifest, build):
+        """name의 현재 버전 IPC 파일이 없으면 build(manifest)로 만들어 쓰고 매핑해서 반환"""
+        shared_file = self._get_shared_file(name, manifest)
+        if not shared_file.exists():
+            write_ipc_atomic(build(manifest), shared_file)
+            # 이미 매핑한 프로세스는 파일이 지워져도 기존 매핑을 계속 쓸 수 있습니다.
+            for old_file in self.cache_dir.glob(f"{name}-*.arrow"):
+                if old_file != shared_file:
+                    old_file.unlink(missing_ok=True)
+        return read_ipc_mapped(shared_file)
+
+    def _read_manifest(self):
+        manifest_file = self.cache_dir / "manifest.json"
+        return json.loads(manifest_file.read_text()) if manifest_file.exists() else None
+
+    def _write_manifest(self, manifest):
+        write_json_atomic(manifest, self.cache_dir / "manifest.json")
+
+
+@st.cache_resource(max_entries=4)
+def get_cargo_store(years=None, in_memory=True):
+    return EnrichedCargoStore(years, in_memory)
+
+
+# --- Cargo Cube ---
+def group_cargo_rows(df, keys):
+    """keys 조합별 그룹 번호(처음 나온 순서)와 그룹별 첫 행 여부
+
+    공유 메모리의 Arrow dictionary 컬럼은 dropna=False여도 결측 키의 그룹 번호가 NaN이 되므로
+    키 컬럼을 category로 바꿔서 묶습니다.
+    """
+    keys_df = get_pandas_frame(df[keys])
+    group_ids = keys_df.groupby(keys, observed=True, dropna=False, sort=False).ngroup().to_numpy()
+    first_rows = ~pd.Series(group_ids).duplicated().to_numpy()
+    return keys_df, group_ids, first_rows
+
+
+# 큐브 키 - 나머지 참조 컬럼(항공사명, 도시/국가/노선 등)은 이 키에 종속되므로 그대로 따라갑니다.
+CARGO_CUBE_KEYS = [
+    Columns.FLIGHT_DATE,
+    Columns.DEPARTURE,
+    Columns.ARRIVAL,
+    Columns.AIRLINE,
+    Columns.AIRCRAFT_TYPE,
+    Columns.PASSENGER_CARGO,
+]
+# 큐브 칸별 원본(병합) 행 수
+CARGO_CUBE_ROWS = "행 수"
+
+
+@timed
+def build_cargo_cube(df):
+    """병합 테이블을 운항일자 × 출발/도착 공항 × 항공사 × 기종 × 여객/화물 단위로 합산 (총중량, 행 수)
+
+    나머지 참조 컬럼은 키에 따라 정해지므로 칸의 첫 행 값을 씁니다. 편명은 키가 아니므로 빼고,
+    운항편수는 KPI 조각의 편명 목록(build_cargo_kpi_flights)에서 셉니다.
+    합계 중량은 톤 단위 float64로 둡니다 (병합 테이블이 kg 정수여도 같음).
+    """
+    _, group_ids, first_rows = group_cargo_rows(df, CARGO_CUBE_KEYS)
+    cube = df.loc[first_rows, df.columns.drop(Columns.FLIGHT_NUM)].reset_index(drop=True)
+    cube[Columns.TOTAL_WEIGHT] = np.bincount(group_ids, weights=get_weight_tonnes(df[Columns.TOTAL_WEIGHT]))
+    cube[CARGO_CUBE_ROWS] = np.bincount(group_ids).astype(np.int32)
+    return cube
+
+
+def combine_cargo_cube(cube, delta_cube):
+    # 추가분은 워터마크 이후 운항일자만 담고 있어 키가 겹치지 않습니다.
+    return concat_cargo_frames([cube, delta_cube])
+
+
+register_cargo_aggregate("cube", build_cargo_cube, combine_cargo_cube)
+
+
+# --- Cargo KPI Partials ---
+# 요약 지표(기간/운항편수/중량) 조각 키 - 운항일자별로 사이드바에서 거를 수 있는 컬럼만 남깁니다.
+CARGO_KPI_KEYS = [
+    Columns.FLIGHT_DATE,
+    f"{Columns.ROUTE_NAME}_x",
+    f"{Columns.COUNTRY_NAME}_x",
+    f"{Columns.CITY_NAME}_x",
+    f"{Columns.ROUTE_NAME}_y",
+    f"{Columns.COUNTRY_NAME}_y",
+    f"{Columns.CITY_NAME}_y",
+    Columns.AIRLINE_NAME,
+    Columns.AIRLINE_COUNTRY,
+    Columns.PASSENGER_CARGO,
+]
+# 조각별 편명 수 - 조각 i의 편명은 kpi_flights에서 앞 조각들의 편명 수 합계부터 이 수만큼입니다.
+CARGO_KPI_FLIGHTS = "편명 수"
+
+
+def get_cargo_kpi_flights(df, group_ids):
+    """조각별 편명 목록 (조각 순서, 조각 안에서는 편명 코드 순서) - (조각 번호, 편명 category)"""
+    flight = get_pandas_frame(df[[Columns.FLIGHT_NUM]])[Columns.FLIGHT_NUM].astype("category")
+    # 결측 편명도 drop_duplicates와 같이 한 값으로 셉니다 (코드 -1 → 0).
+    size = len(flight.cat.categories) + 1
+    pairs = np.unique(group_ids.astype(np.int64) * size + flight.cat.codes.to_numpy() + 1)
+    codes = (pairs % size - 1).astype(flight.cat.codes.dtype)
+    return pairs // size, pd.Categorical.from_codes(codes, dtype=flight.dtype)
+
+
+@timed
+def build_cargo_kpi(df):
+    """운항일자 × 필터 컬럼별 요약 지표 조각 (총중량, 편명 수)
+
+    조각의 편명 목록은 build_cargo_kpi_flights가 같은 조각 순서로 따로 보관합니다.
+    중량은 조각을 많이 더해도 오차가 쌓이지 않도록 float64로 보관합니다.
+    """
+    keys_df, group_ids, first_rows = group_cargo_rows(df, CARGO_KPI_KEYS)
+    kpi = keys_df[first_rows].reset_index(drop=True)
+    kpi[Columns.TOTAL_WEIGHT] = np.bincount(group_ids, weights=get_weight_tonnes(df[Columns.TOTAL_WEIGHT]))
+    groups, _ = get_cargo_kpi_flights(df, group_ids)
+    kpi[CARGO_KPI_FLIGHTS] = np.bincount(groups, minlength=len(kpi)).astype(np.int32)
+    return kpi
+
+
+@timed
+def build_cargo_kpi_flights(df):
+    """KPI 조각별 운항편 목록 (편명 한 컬럼) - 여러 조각을 합쳐도 운항편수를 중복 없이 셀 수 있습니다."""
+    _, group_ids, _ = group_cargo_rows(df, CARGO_KPI_KEYS)
+    _, flights = get_cargo_kpi_flights(df, group_ids)
+    return pd.DataFrame({Columns.FLIGHT_NUM: flights})
+
+
+# 추가분은 워터마크 이후 운항일자만 담고 있어 큐브와 같이 이어붙이면 됩니다 (두 집계의 조각 순서도 그대로 유지).
+register_cargo_aggregate("kpi", build_cargo_kpi, combine_cargo_cube)
+register_cargo_aggregate("kpi_flights", build_cargo_kpi_flights, combine_cargo_cube)
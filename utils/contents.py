@@ -1,42 +1,88 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import time
+import hashlib
+import json
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from pandas.api.types import union_categoricals
 from config import (
     Columns,
     ChartConfig,
-    DefaultFilters
+    DefaultFilters,
+    FIGURE_CACHE_MB
 )
+from utils.query import QueryCache
+from utils.metrics import timed
+
+# 그림 캐시 항목 수 한도 (용량은 config.FIGURE_CACHE_MB)
+FIGURE_CACHE_ENTRIES = 256
 
 
 # --- Common Mapbox ---
 def stream_data(strings):
-    for char in strings:
-        yield char
-        time.sleep(0.01)
+    # 줄 단위로 바로 내보냅니다 (글자마다 지연을 두면 요약이 늦게 그려짐).
+    for line in strings.splitlines(keepends=True):
+        yield line
+
+
+# --- Page Aggregates ---
+# 페이지의 차트들이 쓰는 키 - 필터된 행은 이 키로 한 번만 합산하고(query.aggregate) 차트별로 다시 묶습니다.
+AIRPORT_COLS = [
+    Columns.REGION_NAME,
+    Columns.COUNTRY_NAME,
+    Columns.CITY_NAME,
+    Columns.IATA,
+    Columns.LATITUDE,
+    Columns.LONGITUDE,
+]
+ROUTE_PAGE_KEYS = [f"{col}_{side}" for side in ["x", "y"] for col in AIRPORT_COLS] + [
+    Columns.PASSENGER_CARGO,
+    Columns.AIRLINE_NAME,
+    "Acft Name",
+]
+AIRLINE_PAGE_KEYS = [
+    "Acft Name",
+    f"{Columns.ROUTE_NAME}_z",
+    f"{Columns.COUNTRY_NAME}_z",
+    f"{Columns.CITY_NAME}_z",
+]
+
+
+def sum_by(df, by):
+    """페이지 집계를 차트에 필요한 키로 다시 합산 (키가 빈 행은 제외)"""
+    return df.groupby(by, observed=True)[Columns.TOTAL_WEIGHT].sum().reset_index()
+
+
+# --- Figure Cache ---
+@st.cache_resource
+def get_figure_cache():
+    """직렬화한 Plotly 그림 캐시 - 세션 간에 공유하며 한도를 넘으면 오래 쓰지 않은 것부터 제거"""
+    return QueryCache(max_entries=FIGURE_CACHE_ENTRIES, max_bytes=FIGURE_CACHE_MB * 1024 * 1024)
+
+
+def get_figure_key(name, df, options):
+    # 차트 입력(집계 데이터)의 값 해시와 컬럼명, 차트 옵션이 모두 같으면 같은 그림입니다.
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update(json.dumps([list(map(str, df.columns)), options], ensure_ascii=False, default=str).encode())
+    return ("figure", name, digest.hexdigest())
+
+
+def get_cached_figure(name, df, build, **options):
+    """build()로 만든 그림을 JSON으로 캐시하고 매번 새 Figure로 복원해 반환
+
+    df: 그림에 쓰이는 집계 데이터, options: 그림을 바꾸는 나머지 선택값(경로, 컬럼 등)
+    """
+    spec = get_figure_cache().get(get_figure_key(name, df, options), lambda: pio.to_json(build(), validate=False))
+    return pio.from_json(spec)
 
 
 # --- Cargo Transfer.py ---
-def make_cargo_route_pie_chart(df, airport_ref):
-    grouped_df = (
-        df.groupby([Columns.FLIGHT_DATE, Columns.DEPARTURE, Columns.ARRIVAL])[Columns.TOTAL_WEIGHT]
-        .sum()
-        .reset_index(name=Columns.TOTAL_WEIGHT)
-    )
-    
-    for io in [Columns.DEPARTURE, Columns.ARRIVAL]:
-        grouped_df = pd.merge(
-            grouped_df,
-            airport_ref,
-            left_on=io,
-            right_on=[Columns.IATA],
-            how="left",
-        )
-    
-    grouped_df = grouped_df[
-        (grouped_df[f"{Columns.IATA}_x"].notnull()) & (grouped_df[f"{Columns.IATA}_y"].notnull())
-    ]
+@timed
+def make_cargo_route_pie_chart(route_df):
+    """출발/도착 지역별 선버스트 차트 (route_df: query.aggregate(ROUTE_PAGE_KEYS))"""
+    grouped_df = route_df[route_df[f"{Columns.IATA}_x"].notnull() & route_df[f"{Columns.IATA}_y"].notnull()]
     
     selected_checkboxes = st.multiselect(
         "-",
@@ -66,67 +112,158 @@ def make_cargo_route_pie_chart(df, airport_ref):
     if len(path) != 0:
         caption = " ➡️ ".join(selected_checkboxes)
         st.caption(f"[상세설명] {caption} 순으로 행선지를 표기합니다.")
-        graph_df = grouped_df.groupby(path)[Columns.TOTAL_WEIGHT].sum().reset_index()
-        fig = px.sunburst(
-            graph_df,
-            path=path,
-            values=Columns.TOTAL_WEIGHT,
-            height=ChartConfig.PIE_CHART_HEIGHT,
+        graph_df = sum_by(grouped_df, path)
+
+        def build():
+            fig = px.sunburst(
+                graph_df,
+                path=path,
+                values=Columns.TOTAL_WEIGHT,
+                height=ChartConfig.PIE_CHART_HEIGHT,
+            )
+            fig.update_traces(
+                textinfo="label+value+percent parent",
+                texttemplate="%{label} <br> %{value:,.0f}톤 <br> (%{percentRoot:.1%})",
+            )
+            return fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
+
+        return get_cached_figure("route_pie_chart", graph_df, build, path=path)
+    return None
+
+
+# 지도 표시 단위 - 단위가 세밀할수록 확대해서 보여줍니다 (상위 단위부터의 키, 줌)
+MAP_LEVELS = {
+    "지역": ([Columns.REGION_NAME], 1),
+    "국가": ([Columns.REGION_NAME, Columns.COUNTRY_NAME], ChartConfig.DEFAULT_ZOOM),
+    "도시": ([Columns.REGION_NAME, Columns.COUNTRY_NAME, Columns.CITY_NAME], 3),
+    "공항": ([Columns.REGION_NAME, Columns.COUNTRY_NAME, Columns.CITY_NAME, Columns.IATA], 4),
+}
+
+
+def to_unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def to_lat_lon(xyz):
+    x, y, z = xyz[..., 0], xyz[..., 1], xyz[..., 2]
+    return np.degrees(np.arctan2(z, np.hypot(x, y))), np.degrees(np.arctan2(y, x))
+
+
+def get_map_points(route_df, io, level):
+    """출발(io="전")/도착(io="후") 중량을 표시 단위(level)별로 묶은 지도 점
+
+    점 위치는 소속 공항 좌표를 중량으로 가중 평균한 구면 중심점입니다 (날짜변경선 부근도 올바르게 계산).
+    """
+    side = "x" if io == Columns.DEPARTURE else "y"
+    airports = sum_by(route_df, [f"{col}_{side}" for col in AIRPORT_COLS])
+    airports.columns = AIRPORT_COLS + [Columns.TOTAL_WEIGHT]
+    keys, _ = MAP_LEVELS[level]
+    # 중량이 0인 공항도 위치는 남도록 아주 작은 가중치를 둡니다.
+    weights = np.maximum(airports[Columns.TOTAL_WEIGHT].to_numpy(dtype=float), 1e-9)
+    xyz = to_unit_vectors(airports[Columns.LATITUDE].to_numpy(dtype=float), airports[Columns.LONGITUDE].to_numpy(dtype=float))
+    xyz = pd.DataFrame(xyz * weights[:, None], columns=["x", "y", "z"])
+    points = pd.concat([airports[keys + [Columns.TOTAL_WEIGHT]], xyz], axis=1).groupby(keys, observed=True).sum().reset_index()
+    points[Columns.LATITUDE], points[Columns.LONGITUDE] = to_lat_lon(points[["x", "y", "z"]].to_numpy())
+    return points.drop(columns=["x", "y", "z"])
+
+
+@timed
+def make_cargo_mapbox(route_df, io, level="공항"):
+    """출발(io="전")/도착(io="후") 지도 (route_df: query.aggregate(ROUTE_PAGE_KEYS))
+
+    level: 표시 단위 (MAP_LEVELS) - 선택한 단위로 미리 묶은 점만 보내고 그 단위에 맞게 확대합니다.
+    """
+    mapbox_df = get_map_points(route_df, io, level)
+    keys, zoom = MAP_LEVELS[level]
+    # 세부 단위부터 상위 3단계까지 (공항: IATA/도시/국가)
+    hover_data = keys[::-1][:3] + [Columns.TOTAL_WEIGHT]
+
+    def build():
+        fig = px.scatter_mapbox(
+            mapbox_df,
+            lat=Columns.LATITUDE,
+            lon=Columns.LONGITUDE,
+            mapbox_style=ChartConfig.MAPBOX_STYLE,
+            color=Columns.TOTAL_WEIGHT,
+            color_continuous_scale=getattr(px.colors.sequential, ChartConfig.COLOR_SCALE),
+            size=Columns.TOTAL_WEIGHT,
+            hover_data=hover_data,
+            zoom=zoom,
+            height=ChartConfig.MAP_HEIGHT,
         )
-        fig.update_traces(
-            textinfo="label+value+percent parent",
-            texttemplate="%{label} <br> %{value:,.0f}톤 <br> (%{percentRoot:.1%})",
+        fig.update_coloraxes(showscale=False)
+        return fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
+
+    return get_cached_figure("mapbox", mapbox_df, build, zoom=zoom)
+
+
+def get_great_circle_paths(start, end, points=ChartConfig.FLOW_ARC_POINTS):
+    """출발/도착 단위벡터 배열 → 대권 경로 좌표 (경로 사이에 NaN을 넣어 한 trace로 그림)"""
+    omega = np.arccos(np.clip((start * end).sum(axis=1), -1, 1))[:, None]
+    t = np.linspace(0, 1, points)[None, :]
+    sin_omega = np.sin(omega)
+    same = sin_omega < 1e-9  # 출발/도착이 같은 위치
+    a = np.where(same, 1 - t, np.sin((1 - t) * omega) / np.where(same, 1, sin_omega))
+    b = np.where(same, t, np.sin(t * omega) / np.where(same, 1, sin_omega))
+    lat, lon = to_lat_lon(a[..., None] * start[:, None, :] + b[..., None] * end[:, None, :])
+    # 날짜변경선을 지나는 경로가 지도를 가로지르지 않도록 경로 안에서 경도를 이어 붙입니다.
+    lon = np.degrees(np.unwrap(np.radians(lon), axis=1))
+    gap = np.full((len(lat), 1), np.nan)
+    return np.hstack([lat, gap]).ravel(), np.hstack([lon, gap]).ravel()
+
+
+@timed
+def make_cargo_flow_map(route_df, top_n=ChartConfig.FLOW_TOP_N):
+    """중량 상위 top_n개 출발-도착 공항 노선을 대권 경로로 표시 (route_df: query.aggregate(ROUTE_PAGE_KEYS))"""
+    cols = [Columns.CITY_NAME, Columns.IATA, Columns.LATITUDE, Columns.LONGITUDE]
+    pairs = sum_by(route_df, [f"{col}_{side}" for side in ["x", "y"] for col in cols])
+    pairs = pairs.nlargest(top_n, Columns.TOTAL_WEIGHT).reset_index(drop=True)
+
+    def build():
+        start = to_unit_vectors(pairs[f"{Columns.LATITUDE}_x"].to_numpy(dtype=float), pairs[f"{Columns.LONGITUDE}_x"].to_numpy(dtype=float))
+        end = to_unit_vectors(pairs[f"{Columns.LATITUDE}_y"].to_numpy(dtype=float), pairs[f"{Columns.LONGITUDE}_y"].to_numpy(dtype=float))
+        lat, lon = get_great_circle_paths(start, end)
+        mid_lat, mid_lon = to_lat_lon(start + end)
+        weights = pairs[Columns.TOTAL_WEIGHT]
+        labels = (
+            pairs[f"{Columns.CITY_NAME}_x"].astype(str) + " (" + pairs[f"{Columns.IATA}_x"].astype(str) + ") → "
+            + pairs[f"{Columns.CITY_NAME}_y"].astype(str) + " (" + pairs[f"{Columns.IATA}_y"].astype(str) + ")<br>"
+            + weights.map("{:,.0f}톤".format)
+        )
+        colors = getattr(px.colors.sequential, ChartConfig.COLOR_SCALE)
+        fig = go.Figure(
+            [
+                go.Scattermapbox(lat=lat, lon=lon, mode="lines", line=dict(width=2, color=colors[-3]), hoverinfo="skip"),
+                # 경로 중간점에 중량 표시 (선에는 hover가 없음)
+                go.Scattermapbox(
+                    lat=mid_lat,
+                    lon=mid_lon,
+                    mode="markers",
+                    marker=dict(
+                        size=np.sqrt(weights / weights.max()) * 20 + 4 if len(pairs) else [],
+                        color=weights,
+                        colorscale=ChartConfig.COLOR_SCALE,
+                    ),
+                    text=labels,
+                    hoverinfo="text",
+                ),
+            ]
+        )
+        center_lat, center_lon = to_lat_lon((start + end).sum(axis=0)) if len(pairs) else (0, 0)
+        fig.update_layout(
+            mapbox=dict(style=ChartConfig.MAPBOX_STYLE, zoom=ChartConfig.DEFAULT_ZOOM - 1, center=dict(lat=center_lat, lon=center_lon)),
+            showlegend=False,
+            height=ChartConfig.MAP_HEIGHT,
+            margin=dict(l=0, r=0, t=0, b=0),
         )
-        fig = fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
         return fig
-    return None
 
-
-def make_cargo_mapbox(df, airport_ref, io):
-    grouped_df = df.groupby([io])[Columns.TOTAL_WEIGHT].sum().reset_index(name=Columns.TOTAL_WEIGHT)
-    grouped_df = pd.merge(
-        grouped_df,
-        airport_ref,
-        left_on=io,
-        right_on=[Columns.IATA],
-        how="left",
-    )
-    
-    px_path = [
-        Columns.REGION_NAME,
-        Columns.COUNTRY_NAME,
-        Columns.CITY_NAME,
-        Columns.IATA,
-        Columns.LATITUDE,
-        Columns.LONGITUDE,
-    ]
-    
-    mapbox_df = grouped_df.groupby(px_path)[Columns.TOTAL_WEIGHT].sum().reset_index(name=Columns.TOTAL_WEIGHT)
-    hover_data = [
-        Columns.IATA,
-        Columns.CITY_NAME,
-        Columns.COUNTRY_NAME,
-        Columns.TOTAL_WEIGHT,
-    ]
-
-    fig = px.scatter_mapbox(
-        mapbox_df,
-        lat=Columns.LATITUDE,
-        lon=Columns.LONGITUDE,
-        mapbox_style=ChartConfig.MAPBOX_STYLE,
-        color=Columns.TOTAL_WEIGHT,
-        color_continuous_scale=getattr(px.colors.sequential, ChartConfig.COLOR_SCALE),
-        size=Columns.TOTAL_WEIGHT,
-        hover_data=hover_data,
-        zoom=ChartConfig.DEFAULT_ZOOM,
-        height=ChartConfig.MAP_HEIGHT,
-    )
-    fig.update_coloraxes(showscale=False)
-    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0))
-    return fig
+    return get_cached_figure("flow_map", pairs, build)
 
 
-def make_cargo_treemap(df):
+@timed
+def make_cargo_treemap(route_df):
     selected_checkboxes = st.multiselect(
         "-",
         [Columns.PASSENGER_CARGO, Columns.AIRLINE_NAME, "Acft Name"],
@@ -136,7 +273,101 @@ def make_cargo_treemap(df):
     
     path = selected_checkboxes
     if len(path) != 0:
-        graph_df = df.groupby(path)[Columns.TOTAL_WEIGHT].sum().reset_index()
+        graph_df = sum_by(route_df, path)
+
+        def build():
+            fig = px.treemap(
+                graph_df,
+                path=path,
+                values=Columns.TOTAL_WEIGHT,
+                height=ChartConfig.TREEMAP_HEIGHT,
+            )
+            fig.update_traces(
+                textinfo="label+value+percent parent",
+                texttemplate="%{label} <br> %{value:,.0f}톤 <br> (%{percentRoot:.1%})",
+                textfont=dict(size=16),
+                hoverinfo="label+value+percent parent", 
+                textposition="middle center",
+            )
+            return fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
+
+        return get_cached_figure("route_treemap", graph_df, build, path=path)
+
+
+# --- Route Page Sections ---
+# 섹션마다 fragment로 감싸 섹션 안의 위젯을 바꾸면 그 섹션만 다시 그립니다 (route_df는 전체 실행 때 값을 재사용).
+ROUTE_MAP_VIEWS = ["출발도시", "도착도시", "주요 노선"]
+
+
+@st.fragment
+@timed
+def render_cargo_route_pie_section(route_df):
+    fig = make_cargo_route_pie_chart(route_df)
+    if fig != None:
+        st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+@timed
+def render_cargo_map_section(route_df):
+    """지도 섹션 - st.tabs는 숨은 탭까지 모두 계산하므로 선택한 화면만 그립니다."""
+    st.caption(f" * 인터넷 접속이 제한되어 배경지도가 나타나지 않을 수 있습니다.")
+    view = st.radio(
+        "지도",
+        ROUTE_MAP_VIEWS,
+        horizontal=True,
+        key="cargo_map_view",
+        label_visibility="collapsed",
+    )
+    if view == "주요 노선":
+        st.caption(f" * 중량 상위 {ChartConfig.FLOW_TOP_N}개 공항 노선")
+        fig = make_cargo_flow_map(route_df)
+    else:
+        map_level = st.radio(
+            "표시 단위",
+            list(MAP_LEVELS),
+            index=DefaultFilters.MAP_LEVEL_INDEX,
+            horizontal=True,
+            key="cargo_map_level",
+        )
+        fig = make_cargo_mapbox(route_df, io="전" if view == "출발도시" else "후", level=map_level)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+@timed
+def render_cargo_treemap_section(route_df):
+    st.subheader(f"🛫 점유율 분석")
+    fig = make_cargo_treemap(route_df)
+    if fig != None:
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# --- Cargo Airline Analysis Functions ---
+@timed
+def make_cargo_airline_stream_text(query):
+    """항공사별 화물 분석 요약 텍스트 출력"""
+    st.subheader(f"👨🏽 Summary")
+    summary = query.summary()
+    화물기총량 = summary["cargo_weight"]
+    여객기총량 = summary["passenger_weight"]
+    총량 = summary["weight"]
+    text = f"""
+        * [기간] {summary["start"]} ~ {summary["end"]}
+        * [운항편수] {summary["flights"]:,}편
+        * [총 환적중량] {총량:,.0f}톤 (화물: {화물기총량/총량*100:,.1f}%, 여객: {여객기총량/총량*100:,.1f}%)
+        """
+    st.write_stream(stream_data(text))
+
+
+@timed
+def make_cargo_airline_treemap(airline_df):
+    """항공사별 기종 사용 현황 트리맵 (airline_df: query.aggregate(AIRLINE_PAGE_KEYS))"""
+    path = ["Acft Name"]
+    graph_df = sum_by(airline_df, path)
+    graph_df[Columns.TOTAL_WEIGHT] = graph_df[Columns.TOTAL_WEIGHT].astype(int)
+
+    def build():
         fig = px.treemap(
             graph_df,
             path=path,
@@ -147,112 +378,109 @@ def make_cargo_treemap(df):
             textinfo="label+value+percent parent",
             texttemplate="%{label} <br> %{value:,.0f}톤 <br> (%{percentRoot:.1%})",
             textfont=dict(size=16),
-            hoverinfo="label+value+percent parent", 
+            hoverinfo="label+value+percent parent",
             textposition="middle center",
         )
-        fig = fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
-        return fig
+        return fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
 
+    return get_cached_figure("airline_treemap", graph_df, build, path=path)
 
-# --- Cargo Airline Analysis Functions ---
-def make_cargo_airline_stream_text(df):
-    """항공사별 화물 분석 요약 텍스트 출력"""
-    st.subheader(f"👨🏽 Summary")
-    화물기총량 = df[df[Columns.PASSENGER_CARGO] == "화물"][Columns.TOTAL_WEIGHT].sum()
-    여객기총량 = df[df[Columns.PASSENGER_CARGO] == "여객"][Columns.TOTAL_WEIGHT].sum()
-    총량 = df[Columns.TOTAL_WEIGHT].sum()
-    text = f"""
-        * [기간] {df[Columns.FLIGHT_DATE].dt.date.min()} ~ {df[Columns.FLIGHT_DATE].dt.date.max()}
-        * [운항편수] {len(df[[Columns.FLIGHT_DATE, Columns.FLIGHT_NUM]].drop_duplicates()):,}편
-        * [총 환적중량] {총량:,.0f}톤 (화물: {화물기총량/총량*100:,.1f}%, 여객: {여객기총량/총량*100:,.1f}%)
-        """
-    st.write_stream(stream_data(text))
 
+@timed
+def get_airline_ranking_frame(airline_df, compare_df, cols):
+    """cols 기준별 순위/점유율/전년 대비를 한 번에 계산 (airline_df/compare_df: query.aggregate(AIRLINE_PAGE_KEYS))
 
-def make_cargo_airline_treemap(df):
-    """항공사별 기종 사용 현황 트리맵"""
-    path = ["Acft Name"]
-    graph_df = df.groupby(path)[Columns.TOTAL_WEIGHT].sum().reset_index()
-    graph_df[Columns.TOTAL_WEIGHT] = graph_df[Columns.TOTAL_WEIGHT].astype(int)
-    fig = px.treemap(
-        graph_df,
-        path=path,
-        values=Columns.TOTAL_WEIGHT,
-        height=ChartConfig.TREEMAP_HEIGHT,
-    )
-    fig.update_traces(
-        textinfo="label+value+percent parent",
-        texttemplate="%{label} <br> %{value:,.0f}톤 <br> (%{percentRoot:.1%})",
-        textfont=dict(size=16),
-        hoverinfo="label+value+percent parent",
-        textposition="middle center",
+    기준별 키 코드를 이어 붙여(grouping sets) 당해/전년 중량을 bincount 한 번씩으로 합산합니다.
+    반환: 기준 컬럼("기준")과 키 컬럼("key")을 포함한 긴 형식, 기준별 중량 내림차순
+    """
+    dtype = airline_df[Columns.TOTAL_WEIGHT].dtype
+    dims, keys, current_codes, compare_codes = [], [], [], []
+    for col in cols:
+        values = [airline_df[col], compare_df[col]]
+        if all(isinstance(value.dtype, pd.CategoricalDtype) for value in values):
+            # category 컬럼은 문자열 비교 없이 두 기간의 범주만 합쳐 코드를 맞춥니다.
+            union = union_categoricals(values, sort_categories=True)
+            codes, uniques = union.codes, union.categories
+        else:
+            codes, uniques = pd.factorize(pd.concat(values).astype(object), sort=True)
+        # 기준마다 코드 구간을 나눠 하나의 코드 공간으로 합칩니다 (결측 키는 -1 그대로)
+        codes = np.where(codes >= 0, codes + len(keys), -1)
+        current_codes.append(codes[: len(airline_df)])
+        compare_codes.append(codes[len(airline_df) :])
+        dims += [col] * len(uniques)
+        keys += list(uniques)
+
+    def sum_weights(df, codes):
+        codes = np.concatenate(codes)
+        weights = np.tile(df[Columns.TOTAL_WEIGHT].to_numpy(dtype=float), len(cols))
+        valid = codes >= 0
+        sums = np.bincount(codes[valid], weights=weights[valid], minlength=len(keys))
+        counts = np.bincount(codes[valid], minlength=len(keys))
+        return pd.Series(sums, dtype=dtype).where(counts > 0)
+
+    rank_df = pd.DataFrame(
+        {
+            "기준": dims,
+            "key": keys,
+            Columns.TOTAL_WEIGHT: sum_weights(airline_df, current_codes),
+            "전년실적": sum_weights(compare_df, compare_codes),
+        }
     )
-    fig = fig.update_layout(margin=dict(t=1, l=1, r=1, b=1))
-    return fig
+    # 당해 실적이 있는 키만 순위에 넣습니다 (전년에만 있는 키 제외)
+    rank_df = rank_df[rank_df[Columns.TOTAL_WEIGHT].notna()]
+    rank_df = rank_df.sort_values(by=["기준", Columns.TOTAL_WEIGHT], ascending=[True, False], kind="stable")
+    total = rank_df.groupby("기준")[Columns.TOTAL_WEIGHT].transform("sum")
+    rank_df["점유율(%)"] = (rank_df[Columns.TOTAL_WEIGHT] / total * 100).round(2)
+    rank_df["전년대비증가율(%)"] = ((rank_df[Columns.TOTAL_WEIGHT] - rank_df["전년실적"]) / rank_df["전년실적"] * 100).round(2)
+    rank_df[Columns.TOTAL_WEIGHT] = rank_df[Columns.TOTAL_WEIGHT].fillna(0).astype(int)
+    rank_df["전년실적"] = rank_df["전년실적"].fillna(0).astype(int)
+    return rank_df.reset_index(drop=True)
 
 
-def make_cargo_airline_ranking_bar(df, compare_df, col):
-    """항공사별 순위 바 차트 (전년 대비)"""
+@timed
+def make_cargo_airline_ranking_bar(rank_df, col):
+    """항공사별 순위 바 차트 (전년 대비, rank_df: get_airline_ranking_frame 결과)"""
     integer_input = 20
-    rank_figure = (
-        df.groupby([col])[Columns.TOTAL_WEIGHT]
-        .sum()
-        .reset_index()
-        .sort_values(by=Columns.TOTAL_WEIGHT, ascending=False)
-    )
-    total = rank_figure[Columns.TOTAL_WEIGHT].sum()
-    compare_rank = (
-        compare_df.groupby([col])[Columns.TOTAL_WEIGHT].sum().reset_index(name="전년실적")
-    )
-    rank_figure["점유율(%)"] = round(rank_figure[Columns.TOTAL_WEIGHT] / total * 100, 2)
-    rank_figure2 = pd.merge(rank_figure, compare_rank, on=col, how="left")
-    rank_figure2["전년대비증가율(%)"] = round(
-        (rank_figure2[Columns.TOTAL_WEIGHT] - rank_figure2["전년실적"])
-        / rank_figure2["전년실적"]
-        * 100,
-        2,
-    )
-    rank_figure2[Columns.TOTAL_WEIGHT] = rank_figure2[Columns.TOTAL_WEIGHT].fillna(0).astype(int)
-    rank_figure2["전년실적"] = rank_figure2["전년실적"].fillna(0).astype(int)
-    
-    # 데이터프레임 표시용 포맷팅 적용
-    rank_figure2_display = rank_figure2.copy()
-    rank_figure2_display[Columns.TOTAL_WEIGHT] = rank_figure2_display[Columns.TOTAL_WEIGHT].apply(lambda x: f"{x:,}")
-    rank_figure2_display["전년실적"] = rank_figure2_display["전년실적"].apply(lambda x: f"{x:,}")
+    rank_df = rank_df[rank_df["기준"] == col].drop(columns="기준").rename(columns={"key": col}).reset_index(drop=True)
+    rank_df = rank_df[[col, Columns.TOTAL_WEIGHT, "점유율(%)", "전년실적", "전년대비증가율(%)"]]
     
-    # 전년대비증가율 포맷팅 (NaN, inf 값 처리)
-    def format_growth_rate(x):
-        if pd.isna(x) or x == float('inf') or x == float('-inf'):
-            return "No Data"
-        else:
-            return f"{x:,.1f}%"
-    
-    rank_figure2_display["전년대비증가율(%)"] = rank_figure2_display["전년대비증가율(%)"].apply(format_growth_rate)
-    
-    # 점유율 포맷팅
-    rank_figure2_display["점유율(%)"] = rank_figure2_display["점유율(%)"].apply(lambda x: f"{x:.1f}%" if not pd.isna(x) else "0.0%")
-    
-    figure_df = rank_figure2.head(integer_input)
-    fig = px.bar(
-        figure_df,
-        x=Columns.TOTAL_WEIGHT,
-        y=col,
-        text=figure_df.apply(
-            lambda x: f"{x[Columns.TOTAL_WEIGHT]:,.0f}톤 ({x['점유율(%)']}%)",
-            axis=1,
-        ),
-        template="plotly_dark",
-        color=col,
-        hover_data=[Columns.TOTAL_WEIGHT],
-        orientation="h",
-        height=max(len(figure_df) * 40, 200),
-    )
-    fig.update_layout(
-        xaxis_title="",
-        yaxis_title="",
+    # 데이터프레임 표시용 포맷팅 (행 단위 apply 대신 컬럼 단위로 변환)
+    # 필터 결과가 비면 map이 숫자 dtype을 그대로 두므로 문자열 컬럼으로 맞춥니다.
+    growth = rank_df["전년대비증가율(%)"]
+    rank_display_df = pd.DataFrame(
+        {
+            col: rank_df[col],
+            Columns.TOTAL_WEIGHT: rank_df[Columns.TOTAL_WEIGHT].map("{:,}".format).astype(str),
+            "점유율(%)": rank_df["점유율(%)"].fillna(0).map("{:.1f}%".format).astype(str),
+            "전년실적": rank_df["전년실적"].map("{:,}".format).astype(str),
+            # NaN(전년 실적 없음), inf(전년 실적 0)는 No Data로 표기
+            "전년대비증가율(%)": growth.map("{:,.1f}%".format).astype(str).where(np.isfinite(growth), "No Data"),
+        }
     )
-    fig.update_traces(
-        textfont=dict(color="white", family="Arial"),
-        showlegend=False,
-    )
-    return fig, rank_figure2_display
+    
+    figure_df = rank_df.head(integer_input)
+    labels = rank_display_df[Columns.TOTAL_WEIGHT].head(integer_input) + "톤 (" + figure_df["점유율(%)"].astype(str) + "%)"
+
+    def build():
+        fig = px.bar(
+            figure_df,
+            x=Columns.TOTAL_WEIGHT,
+            y=col,
+            text=labels,
+            template="plotly_dark",
+            color=col,
+            hover_data=[Columns.TOTAL_WEIGHT],
+            orientation="h",
+            height=max(len(figure_df) * 40, 200),
+        )
+        fig.update_layout(
+            xaxis_title="",
+            yaxis_title="",
+        )
+        fig.update_traces(
+            textfont=dict(color="white", family="Arial"),
+            showlegend=False,
+        )
+        return fig
+
+    return get_cached_figure("airline_ranking_bar", figure_df, build, col=col), rank_display_df
@@ -0,0 +1,194 @@
+import streamlit as st
+import pandas as pd
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from config import METRICS, METRICS_FILE, METRICS_FORMAT
+
+# 단계별 소요 시간 기록 (METRICS=1일 때만) - 실행(rerun)마다 페이지/세션을 붙여 METRICS_FILE에 남기고,
+# 관리자에게는 사이드바에 마지막 전체 실행의 단계별 시간을 보여 줍니다.
+# 섹션(fragment)만 다시 실행될 때는 전체 실행 기록에 덧붙이지 않고 fragment 이름을 붙인 별도 실행으로 기록합니다.
+_lock = threading.Lock()
+_totals = defaultdict(lambda: [0, 0.0, 0])  # (page, stage): [횟수, 초, 행 수] - prometheus 누적값
+
+
+# --- Run State ---
+def is_fragment_run(ctx):
+    """fragment만 다시 실행 중인지 (페이지 스크립트는 실행되지 않음)"""
+    if getattr(ctx, "fragment_ids_this_run", None):
+        return True
+    # Streamlit 1.37은 fragment_ids_this_run을 채우지 않아 fragment 래퍼와 같은 방법으로 확인합니다.
+    requests = getattr(ctx, "script_requests", None)
+    return bool(requests and requests.fragment_id_queue)
+
+
+def get_run_state():
+    """현재 세션의 실행 기록 (스크립트 스레드가 아니면 None - 백그라운드 갱신 등)"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+    return st.session_state.get("_metrics_fragment_run" if is_fragment_run(ctx) else "_metrics_run")
+
+
+def new_run_state(page, fragment=None):
+    run = st.session_state.get("_metrics_runs", 0) + 1
+    st.session_state["_metrics_runs"] = run
+    return {
+        "page": page,
+        "session": get_script_run_ctx(suppress_warning=True).session_id[:8],
+        "run": run,
+        "fragment": fragment,
+        "started": time.perf_counter(),
+        "depth": 0,
+        "records": [],
+    }
+
+
+def start_metrics(page):
+    """페이지 실행 기록 시작 (페이지 맨 위에서 호출)"""
+    if not METRICS:
+        return
+    st.session_state["_metrics_run"] = new_run_state(page)
+
+
+def start_fragment_metrics(fragment):
+    """fragment 재실행 기록 시작 - 마지막 전체 실행의 페이지로 새 실행 번호를 받습니다 (전체 실행 전이면 None)"""
+    page_run = st.session_state.get("_metrics_run")
+    if page_run is None:
+        return None
+    st.session_state["_metrics_fragment_run"] = new_run_state(page_run["page"], fragment)
+    return st.session_state["_metrics_fragment_run"]
+
+
+def finish_metrics(show_panel=False):
+    """페이지 전체 시간을 기록하고 누적값 파일을 갱신 (show_panel이면 사이드바에 단계별 시간 표시)"""
+    state = get_run_state() if METRICS else None
+    if state is None:
+        return
+    record_stage("page", time.perf_counter() - state["started"], start=0.0)
+    if METRICS_FORMAT == "prometheus":
+        write_prometheus_file()
+    if show_panel:
+        render_metrics_panel(state)
+
+
+# --- Recording ---
+def get_row_count(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if hasattr(value, "row_count"):  # 필터 단계가 반환하는 utils.query 조회 객체
+        return value.row_count()
+    if isinstance(value, tuple) and value:
+        return get_row_count(value[0])
+    return None
+
+
+def record_stage(stage, seconds, rows=None, start=None):
+    state = get_run_state()
+    record = {
+        "time": datetime.now().isoformat(timespec="milliseconds"),
+        "page": state["page"] if state else "background",
+        "session": state["session"] if state else None,
+        "run": state["run"] if state else None,
+        "fragment": state["fragment"] if state else None,
+        "stage": stage,
+        "depth": state["depth"] if state else 0,
+        "seconds": round(seconds, 4),
+        "rows": rows,
+    }
+    if state is not None:
+        state["records"].append(dict(record, start=start))
+    with _lock:
+        totals = _totals[(record["page"], stage)]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += rows or 0
+        if METRICS_FORMAT != "prometheus":
+            METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(METRICS_FILE, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def timed(func):
+    """함수 실행 시간과 결과 행 수를 '<모듈>.<함수>' 단계로 기록하는 데코레이터 (METRICS가 꺼져 있으면 그대로 반환)"""
+    if not METRICS:
+        return func
+    stage = f"{func.__module__.split('.')[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        state = get_run_state()
+        ctx = get_script_run_ctx(suppress_warning=True)
+        # fragment 재실행의 가장 바깥 단계면 새 실행 기록을 시작합니다.
+        fragment_run = ctx is not None and is_fragment_run(ctx) and (state is None or state["depth"] == 0)
+        if fragment_run:
+            state = start_fragment_metrics(stage)
+        start = time.perf_counter()
+        if state is not None:
+            state["depth"] += 1
+        try:
+            value = func(*args, **kwargs)
+        finally:
+            if state is not None:
+                state["depth"] -= 1
+        record_stage(
+            stage,
+            time.perf_counter() - start,
+            get_row_count(value),
+            start=start - state["started"] if state else None,
+        )
+        # fragment 재실행은 finish_metrics를 거치지 않으므로 여기서 누적값 파일을 갱신합니다.
+        if fragment_run and METRICS_FORMAT == "prometheus":
+            write_prometheus_file()
+        return value
+
+    return wrapper
+
+
+# --- Export ---
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus_file():
+    """프로세스 시작 후 누적된 단계별 횟수/시간/행 수를 Prometheus 텍스트 형식으로 저장 (node_exporter textfile용)"""
+    with _lock:
+        totals = sorted(_totals.items())
+    metrics = [
+        ("cargo_stage_seconds", "summary", "Dashboard stage wall time in seconds"),
+        ("cargo_stage_rows_total", "counter", "Rows returned by dashboard stages"),
+    ]
+    lines = []
+    for name, kind, help_text in metrics:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for (page, stage), (count, seconds, rows) in totals:
+            labels = f'page="{_escape_label(page)}",stage="{_escape_label(stage)}"'
+            if kind == "summary":
+                lines += [f"{name}_count{{{labels}}} {count}", f"{name}_sum{{{labels}}} {seconds:.6f}"]
+            else:
+                lines.append(f"{name}{{{labels}}} {rows}")
+    # 수집기가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    METRICS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = METRICS_FILE.with_name(f".{METRICS_FILE.name}.{os.getpid()}.tmp")
+    tmp_file.write_text("\n".join(lines) + "\n")
+    os.replace(tmp_file, METRICS_FILE)
+
+
+# --- Debug Panel ---
+def render_metrics_panel(state):
+    """관리자용 사이드바 패널 - 마지막 실행의 단계별 시간 (호출 순서, 하위 단계는 들여쓰기)"""
+    records = sorted(state["records"], key=lambda record: (record["start"] is None, record["start"] or 0))
+    df = pd.DataFrame({
+        "단계": ["　" * record["depth"] + record["stage"] for record in records],
+        "초": [record["seconds"] for record in records],
+        "행": pd.array([record["rows"] for record in records], dtype="Int64"),
+    })
+    with st.sidebar.expander("🐞 성능 (관리자)"):
+        st.caption(f"{state['page']} · 세션 {state['session']} · 실행 {state['run']}")
+        st.dataframe(df, hide_index=True, use_container_width=True)
+        st.caption(f"기록 파일: {METRICS_FILE}")
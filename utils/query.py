@@ -0,0 +1,489 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import duckdb
+import threading
+from collections import namedtuple, OrderedDict
+from config import Columns, COMPACT_STORAGE, QUERY_BACKEND, QUERY_CACHE_MB
+from utils.backdata import CARGO_KPI_FLIGHTS, WEIGHT_KG_PER_TONNE, get_cargo_store, get_pandas_frame
+from utils.metrics import timed
+
+# 운항일자에서 파생되는 필터 컬럼 (사이드바 기간 필터용)
+YEAR = "year"
+QUARTER = "quarter"
+MONTH = "month"
+DAY = "day"
+DATE_PARTS = [YEAR, QUARTER, MONTH, DAY]
+
+# 데이터 버전별 조회 결과 캐시 한도 (항목 수, 용량은 config.QUERY_CACHE_MB)
+QUERY_CACHE_ENTRIES = 1024
+
+
+# --- Common ---
+@timed
+def load_cargo_query(years=None):
+    """설정된 백엔드(QUERY_BACKEND)로 병합 화물 데이터 조회 객체 생성
+
+    years: pandas 백엔드에서 메모리에 올릴 연도 목록 (DuckDB는 전체 기간을 디스크에서 조회)
+    pandas 백엔드는 원본 행 대신 저장소의 합산 큐브 집계(get_aggregate("cube"))를 색인해서 조회하고,
+    요약 지표는 운항일자별 KPI 조각(build_cargo_kpi)을 합쳐서 계산합니다.
+    """
+    if QUERY_BACKEND == "duckdb":
+        store = get_cargo_store(None, in_memory=False)
+        snapshot = store.get_snapshot()
+        cache = store.get_derived("query_cache", lambda snapshot: QueryCache(), snapshot)
+        return DuckDBCargoQuery(store.get_parquet_files(snapshot), cache)
+    years = tuple(sorted(years)) if years else None
+    store = get_cargo_store(years)
+    snapshot = store.get_snapshot()
+    index = store.get_derived("cube_index", lambda snapshot: CargoIndex(store.get_aggregate("cube", snapshot)), snapshot)
+    kpi = store.get_derived(
+        "kpi",
+        lambda snapshot: CargoKpi(store.get_aggregate("kpi", snapshot), store.get_aggregate("kpi_flights", snapshot)),
+        snapshot,
+    )
+    cache = store.get_derived("query_cache", lambda snapshot: QueryCache(), snapshot)
+    return PandasCargoQuery(index, cache, kpi=kpi)
+
+
+def get_previous_year_days(days):
+    # 2/29는 전년 2/28로 비교합니다 (DateOffset 규칙)
+    return [(pd.Timestamp(day) - pd.DateOffset(years=1)).date() for day in days]
+
+
+def get_column_values(df, col):
+    if col not in DATE_PARTS:
+        return df[col]
+    flight_date = df[Columns.FLIGHT_DATE]
+    if pd.api.types.is_object_dtype(flight_date) or pd.api.types.is_string_dtype(flight_date):
+        flight_date = pd.to_datetime(flight_date)
+    return {
+        YEAR: lambda: flight_date.dt.year,
+        QUARTER: lambda: flight_date.dt.quarter,
+        MONTH: lambda: flight_date.dt.month,
+        DAY: lambda: flight_date.dt.date,
+    }[col]()
+
+
+def _as_list(values):
+    return list(values) if isinstance(values, (list, tuple, set)) else [values]
+
+
+def get_cache_size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, list):
+        return 64 * len(value)
+    if isinstance(value, str):
+        return len(value)
+    return 0
+
+
+class QueryCache:
+    """데이터 버전(snapshot)별 조회 결과 캐시 - 필터 조건별 선택지/중량순 목록/필터 결과
+
+    세션 간에 공유되므로 같은 조건(예: 기본 동남아 → 미주 화면)은 한 번만 계산합니다.
+    max_entries 또는 max_bytes를 넘으면 가장 오래 쓰지 않은 항목부터 제거합니다.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_ENTRIES, max_bytes=QUERY_CACHE_MB * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key: (값, 크기)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+        value = build()
+        size = get_cache_size(value)
+        with self.lock:
+            if key not in self.entries and size <= self.max_bytes:
+                self.entries[key] = (value, size)
+                self.nbytes += size
+            while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.nbytes}
+
+
+class CargoQuery:
+    """조회 객체 공통 - 선택지(options), 중량순 목록(facet), 페이지 집계(aggregate)는 필터 조건별로 QueryCache에 보관"""
+
+    def __init__(self, cache, filters=()):
+        self.cache = cache
+        self.filters = tuple(filters)
+
+    def signature(self):
+        # 같은 조건이면 선택 순서와 관계없이 같은 키가 되도록 정렬합니다.
+        return tuple(sorted((col, tuple(sorted(values))) for col, values in self.filters))
+
+    def options(self, col):
+        """col의 선택지 (결측 제외, 오름차순)"""
+        return self.cache.get(("options", col, self.signature()), lambda: self._options(col))
+
+    def row_count(self):
+        """필터가 적용된 행 수 (단계별 시간 기록용)"""
+        return self.cache.get(("row_count", self.signature()), self._row_count)
+
+    def facet(self, by):
+        """by 컬럼 조합별 총중량 (중량 내림차순)"""
+        return self.cache.get(
+            ("facet", tuple(by), self.signature()),
+            lambda: self.sum_weight(by).sort_values(by=Columns.TOTAL_WEIGHT, ascending=False),
+        )
+
+    @timed
+    def aggregate(self, by):
+        """페이지의 차트들이 함께 쓰는 by 컬럼 조합별 총중량
+
+        필터된 행은 여기서 한 번만 합산하고 차트는 이 결과를 필요한 키로 다시 묶습니다.
+        차트마다 결측 키 처리가 같도록 키에 빈 값이 있는 행도 남겨 둡니다.
+        """
+        return self.cache.get(("aggregate", tuple(by), self.signature()), lambda: self.sum_weight(by, dropna=False))
+
+    @timed
+    def summary(self):
+        """기간(start/end), 운항편수(flights), 총/화물기/여객기 중량"""
+        return self.cache.get(("summary", self.signature()), self._summary)
+
+
+# --- Pandas ---
+ColumnIndex = namedtuple("ColumnIndex", ["codes", "values", "lookup", "order", "starts"])
+
+
+class CargoIndex:
+    """필터 컬럼별 역색인 (값 → 행 번호 목록)
+
+    컬럼은 처음 필터/선택지 조회에 쓰일 때 한 번만 색인하고 snapshot이 바뀔 때까지 재사용합니다.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.columns = {}
+        self.days = None
+
+    def get_days(self):
+        """운항일자 순 정렬을 이용한 일자별 행 구간 (정렬되어 있지 않으면 None)
+
+        days: 일자별 한 행짜리 데이터프레임, bounds[i] ~ bounds[i + 1]: i번째 일자의 행 구간
+        """
+        if self.days is None:
+            flight_date = self.df[Columns.FLIGHT_DATE]
+            if flight_date.is_monotonic_increasing:
+                codes, days = pd.factorize(flight_date)
+                bounds = np.searchsorted(codes, np.arange(len(days) + 1))
+                self.days = (pd.DataFrame({Columns.FLIGHT_DATE: days}), bounds)
+            else:
+                self.days = (None, None)
+        return self.days
+
+    def get(self, col):
+        if col not in self.columns:
+            codes, values = pd.factorize(get_column_values(self.df, col))
+            order = np.argsort(codes, kind="stable")
+            # 결측(-1)은 정렬 시 앞쪽에 모이므로 그 뒤부터 값별 구간이 시작됩니다.
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+            starts = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+            values = np.asarray(values, dtype=object)
+            self.columns[col] = ColumnIndex(
+                codes, values, {value: code for code, value in enumerate(values)}, order, starts
+            )
+        return self.columns[col]
+
+    def select(self, col, values, positions=None):
+        """col 값이 values인 행 번호 (positions가 주어지면 그 안에서만 찾음)
+
+        행 번호는 정수 배열 또는 연속 구간(slice)입니다.
+        """
+        if col in DATE_PARTS and self.get_days()[0] is not None:
+            return self.select_dates(col, values, positions)
+        index = self.get(col)
+        codes = list({index.lookup[value] for value in values if value in index.lookup})
+        size = sum(index.starts[code + 1] - index.starts[code] for code in codes)
+        if positions is None:
+            return self.get_rows(index, codes)
+        if isinstance(positions, slice):
+            if size < positions.stop - positions.start:
+                rows = self.get_rows(index, codes)
+                return rows[(rows >= positions.start) & (rows < positions.stop)]
+            return np.flatnonzero(np.isin(index.codes[positions], codes)) + positions.start
+        # 선택 값의 행이 상위 단계보다 훨씬 적으면 상위 단계를 훑지 않고 이진 탐색으로 교집합을 구합니다.
+        if size * np.log2(len(positions) + 1) < len(positions):
+            rows = self.get_rows(index, codes)
+            found = np.minimum(np.searchsorted(positions, rows), len(positions) - 1)
+            return rows[positions[found] == rows]
+        return positions[np.isin(index.codes[positions], codes)]
+
+    def get_rows(self, index, codes):
+        rows = [index.order[index.starts[code]:index.starts[code + 1]] for code in codes]
+        return np.sort(np.concatenate(rows)) if rows else np.array([], dtype=np.intp)
+
+    def select_dates(self, col, values, positions=None):
+        """기간 필터 - 선택된 일자들을 연속 행 구간으로 바꿔 이진 탐색으로 잘라냄"""
+        days, bounds = self.get_days()
+        matched = np.flatnonzero(get_column_values(days, col).isin(values).to_numpy())
+        if len(matched) == 0:
+            return np.array([], dtype=np.intp)
+        # 이어진 일자는 하나의 구간으로 합칩니다 (예: 분기/월 선택은 구간 하나)
+        breaks = np.flatnonzero(np.diff(matched) != 1) + 1
+        starts = bounds[matched[np.concatenate([[0], breaks])]]
+        ends = bounds[matched[np.concatenate([breaks - 1, [len(matched) - 1]])] + 1]
+        if isinstance(positions, slice):
+            starts, ends = np.maximum(starts, positions.start), np.minimum(ends, positions.stop)
+            starts, ends = starts[starts < ends], ends[starts < ends]
+        elif positions is not None:
+            run = np.searchsorted(starts, positions, side="right") - 1
+            return positions[(run >= 0) & (positions < ends[np.maximum(run, 0)])]
+        if len(starts) == 1:
+            return slice(int(starts[0]), int(ends[0]))
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)] or [np.array([], dtype=np.intp)])
+
+    def options(self, col, positions=None):
+        index = self.get(col)
+        codes = index.codes if positions is None else index.codes[positions]
+        return list(sorted(index.values[np.unique(codes[codes >= 0])]))
+
+
+class CargoKpi:
+    """KPI 조각 색인과 조각별 편명 목록 (build_cargo_kpi / build_cargo_kpi_flights)
+
+    조각 i의 편명 코드는 flight_codes[bounds[i]:bounds[i + 1]]입니다.
+    """
+
+    def __init__(self, df, flights):
+        self.index = CargoIndex(df)
+        flight = get_pandas_frame(flights)[Columns.FLIGHT_NUM]
+        self.flight_codes = flight.cat.codes.to_numpy()
+        self.num_flights = len(flight.cat.categories)
+        self.bounds = np.concatenate([[0], np.cumsum(df[CARGO_KPI_FLIGHTS].to_numpy(), dtype=np.int64)])
+
+    def count_flights(self, rows):
+        """rows 조각들의 운항편수 - (운항일자, 편명) 쌍을 합친 뒤 중복을 제거해 셉니다."""
+        rows = np.arange(len(self.index.df))[rows] if isinstance(rows, slice) else rows
+        counts = self.bounds[rows + 1] - self.bounds[rows]
+        # 조각별 편명 구간을 이어 붙인 위치 (구간 시작 + 구간 안 순번)
+        offsets = np.repeat(self.bounds[rows] - (np.cumsum(counts) - counts), counts)
+        flight_codes = self.flight_codes[np.arange(counts.sum()) + offsets]
+        day_codes = np.repeat(self.index.get(Columns.FLIGHT_DATE).codes[rows].astype(np.int64), counts)
+        return len(np.unique(day_codes * (self.num_flights + 1) + flight_codes + 1))
+
+
+class PandasCargoQuery(CargoQuery):
+    """메모리의 큐브에 필터를 적용하는 조회 객체
+
+    필터는 색인으로 행 번호만 좁혀 두고, 집계가 필요할 때 한 번만 데이터프레임으로 만듭니다.
+    사이드바의 단계별 필터(노선 → 국가 → 도시 → 연 → 분기 → 월 → 일) 결과는 그때까지의 선택 조건별로
+    캐시되므로, 하위 단계만 바뀌면 바로 위 단계의 결과에서 이어서 계산합니다.
+    """
+
+    def __init__(self, index, cache, positions=None, filters=(), kpi=None):
+        super().__init__(cache, filters)
+        self.index = index
+        self.kpi = kpi  # 요약용 KPI 조각 (CargoKpi)
+        self.positions = positions  # None이면 전체 행
+        self._df = None
+
+    @property
+    def df(self):
+        if self._df is None:
+            if self.positions is None:
+                self._df = self.index.df
+            elif isinstance(self.positions, slice):
+                self._df = self.index.df.iloc[self.positions]  # 기간 필터만 적용된 경우 복사 없이 잘라냄
+            else:
+                # 같은 조건의 필터 결과는 세션 간에 공유합니다.
+                self._df = self.cache.get(("frame", self.signature()), lambda: self.index.df.take(self.positions))
+        return self._df
+
+    def where(self, col, values):
+        values = _as_list(values)
+        filters = self.filters + ((col, tuple(values)),)
+        query = PandasCargoQuery(self.index, self.cache, None, filters, self.kpi)
+        query.positions = self.cache.get(("rows", query.signature()), lambda: self.index.select(col, values, self.positions))
+        return query
+
+    def previous_year(self):
+        """같은 필터(기간 제외)를 적용한 전년 동기 조회 객체
+
+        전체 데이터를 복사하지 않고 운항일자 정렬을 이용해 전년 기간의 행 구간만 찾은 뒤 필터를 다시 적용합니다.
+        """
+        query = PandasCargoQuery(self.index, self.cache, kpi=self.kpi).where(DAY, get_previous_year_days(self.options(DAY)))
+        for col, values in self.filters:
+            if col not in DATE_PARTS:
+                query = query.where(col, values)
+        return query
+
+    def _options(self, col):
+        return self.index.options(col, self.positions)
+
+    def _row_count(self):
+        if self.positions is None:
+            return len(self.index.df)
+        if isinstance(self.positions, slice):
+            return self.positions.stop - self.positions.start
+        return len(self.positions)
+
+    def sum_weight(self, by, dropna=True):
+        # Arrow dictionary 컬럼은 observed=True가 적용되지 않으므로 필요한 컬럼만 category로 바꿔 집계합니다.
+        df = get_pandas_frame(self.df[list(by) + [Columns.TOTAL_WEIGHT]])
+        return df.groupby(by, observed=True, dropna=dropna)[Columns.TOTAL_WEIGHT].sum().reset_index()
+
+    def _summary(self):
+        """선택된 운항일자의 KPI 조각만 골라 합산 (큐브 행을 꺼내지 않음)
+
+        기간 필터는 일자별 연속 구간으로 먼저 잘라내고 나머지 필터는 그 안에서 색인으로 좁힙니다.
+        운항편수는 조각들의 편명 목록을 합쳐 (운항일자, 편명) 중복을 제거해 셉니다.
+        큐브에는 편명이 없으므로 KPI 조각 키(CARGO_KPI_KEYS)에 없는 컬럼으로 거른 조회는 요약할 수 없습니다.
+        """
+        columns = [col for col, _ in self.filters if col not in DATE_PARTS and col not in self.kpi.index.df.columns]
+        if columns:
+            raise ValueError(f"Cannot summarize by columns missing from the KPI partials: {columns}")
+        kpi = self.kpi.index
+        filters = sorted(self.filters, key=lambda item: item[0] not in DATE_PARTS)
+        rows = None
+        for col, values in filters:
+            rows = kpi.select(col, values, rows)
+        if rows is None:
+            rows = slice(0, len(kpi.df))
+        weights = kpi.df[Columns.TOTAL_WEIGHT].to_numpy()[rows]
+        passenger_cargo = kpi.get(Columns.PASSENGER_CARGO)
+        passenger_cargo_codes = passenger_cargo.codes[rows]
+        # 운항일자 순으로 정렬되어 있어 첫 행/마지막 행이 기간의 시작/끝입니다.
+        if isinstance(rows, slice):
+            ends = [rows.start, rows.stop - 1] if rows.stop > rows.start else []
+        else:
+            ends = rows[[0, -1]] if len(rows) else []
+        flight_date = get_column_values(kpi.df.iloc[ends], DAY)
+        return {
+            "start": flight_date.min(),
+            "end": flight_date.max(),
+            "flights": self.kpi.count_flights(rows),
+            "weight": weights.sum(),
+            "cargo_weight": weights[passenger_cargo_codes == passenger_cargo.lookup.get("화물", -2)].sum(),
+            "passenger_weight": weights[passenger_cargo_codes == passenger_cargo.lookup.get("여객", -2)].sum(),
+        }
+
+
+# --- DuckDB ---
+@st.cache_resource
+def get_duckdb_connection():
+    return duckdb.connect()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBCargoQuery(CargoQuery):
+    """디스크의 병합 parquet에 필터/집계를 SQL로 내려 보내는 조회 객체 (집계 결과만 메모리로 가져옴)"""
+
+    def __init__(self, files, cache, filters=()):
+        super().__init__(cache, filters)
+        self.files = [str(f) for f in files]
+
+    def where(self, col, values):
+        return DuckDBCargoQuery(self.files, self.cache, self.filters + ((col, tuple(_as_list(values))),))
+
+    def previous_year(self):
+        """같은 필터(기간 제외)를 적용한 전년 동기 조회 객체"""
+        filters = [(col, values) for col, values in self.filters if col not in DATE_PARTS]
+        return DuckDBCargoQuery(self.files, self.cache, filters).where(DAY, get_previous_year_days(self.options(DAY)))
+
+    def _options(self, col):
+        expr = self._expr(col)
+        where, params = self._where(f"{expr} IS NOT NULL")
+        rows = self._cursor().execute(
+            f"SELECT DISTINCT {expr} FROM {self._source()} {where} ORDER BY 1", params
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _row_count(self):
+        where, params = self._where()
+        return self._cursor().execute(f"SELECT COUNT(*) FROM {self._source()} {where}", params).fetchone()[0]
+
+    def sum_weight(self, by, dropna=True):
+        cols = ", ".join(_quote(col) for col in by)
+        # pandas groupby와 같이 키에 NULL이 있는 행은 제외하고 키 순서로 정렬합니다.
+        where, params = self._where(*[f"{_quote(col)} IS NOT NULL" for col in by if dropna])
+        return self._execute(
+            f"SELECT {cols}, {self._sum_weight()} AS {_quote(Columns.TOTAL_WEIGHT)} "
+            f"FROM {self._source()} {where} GROUP BY {cols} ORDER BY {cols}",
+            params,
+        )
+
+    def _summary(self):
+        where, params = self._where()
+        date, flight = _quote(Columns.FLIGHT_DATE), _quote(Columns.FLIGHT_NUM)
+        pc = _quote(Columns.PASSENGER_CARGO)
+        cargo_weight = self._sum_weight(f"{pc} = '화물'")
+        passenger_weight = self._sum_weight(f"{pc} = '여객'")
+        start, end, total, cargo, passenger = self._cursor().execute(
+            f"SELECT MIN({date}), MAX({date}), COALESCE({self._sum_weight()}, 0), "
+            f"COALESCE({cargo_weight}, 0), COALESCE({passenger_weight}, 0) "
+            f"FROM {self._source()} {where}",
+            params,
+        ).fetchone()
+        flights = self._cursor().execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT {date}, {flight} FROM {self._source()} {where})", params
+        ).fetchone()[0]
+        # 빈 결과의 비율 계산이 pandas와 같이 NaN이 되도록 numpy 실수로 반환합니다.
+        return {
+            "start": start,
+            "end": end,
+            "flights": flights,
+            "weight": np.float64(total),
+            "cargo_weight": np.float64(cargo),
+            "passenger_weight": np.float64(passenger),
+        }
+
+    def _sum_weight(self, when=None):
+        """톤 단위 중량 합계 식 (when이 있으면 그 조건의 행만)"""
+        weight = _quote(Columns.TOTAL_WEIGHT)
+        value = f"CASE WHEN {when} THEN {weight} END" if when else weight
+        # 메모리 절약 모드의 병합 캐시는 중량을 kg 정수로 보관합니다 (utils.backdata.compact_cargo_frame).
+        if COMPACT_STORAGE:
+            return f"SUM({value}) / {WEIGHT_KG_PER_TONNE}.0"
+        return f"SUM({value})"
+
+    def _cursor(self):
+        return get_duckdb_connection().cursor()
+
+    def _execute(self, sql, params):
+        return self._cursor().execute(sql, params).df()
+
+    def _source(self):
+        files = ", ".join("'" + f.replace("'", "''") + "'" for f in self.files)
+        return f"read_parquet([{files}])"
+
+    def _expr(self, col):
+        date = _quote(Columns.FLIGHT_DATE)
+        return {
+            YEAR: f"year({date})",
+            QUARTER: f"quarter({date})",
+            MONTH: f"month({date})",
+            DAY: f"CAST({date} AS DATE)",
+        }.get(col, _quote(col))
+
+    def _where(self, *conditions):
+        clauses, params = list(conditions), []
+        for col, values in self.filters:
+            if not values:
+                clauses.append("FALSE")
+                continue
+            clauses.append(f"{self._expr(col)} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params